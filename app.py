@@ -5,66 +5,766 @@ Flask app for Project 2 - The Meals LAN
 
 import sqlite3
 import os
+import io
 import hashlib
 import hmac
 import base64
 import json
-from flask import Flask, request, jsonify
+import threading
+import atexit
+import signal
+import bisect
+import time
+from contextlib import nullcontext
+from urllib.parse import parse_qs
+from flask import Flask, request, jsonify, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from db_pool import ConnectionPool
+from db_profiles import load_profile, apply_profile, read_effective
+from migrations import migrate, schema_lock, schema_version, has_schema, LATEST_VERSION
+from db_template import SchemaTemplate
+from memory_store import MemoryStore
+from leaderboard import PopularLeaderboard
+from ingredient_index import IngredientIndex
+from recipe_versions import RecipeVersions
+from data_versions import DataVersions, new_generation
+from passwords import PasswordHasher, HashingOverloaded
+from jwt_cache import TokenCache, UserIdCache, token_digest
+from metrics import RequestMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from slow_queries import SlowQueryLog
+import timelines
 
 app = Flask(__name__)
+# Request bodies larger than this are rejected before being read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_BODY_BYTES', str(1024 * 1024)))
 db_name = "project2.db"
 sql_file = "project2.sql"
 db_flag = False
 
-# Read the secret key from key.txt
-with open('key.txt', 'r') as f:
+# How /clear resets the database: "template" copies a schema built once in
+# memory over the live file (pooled connections stay open); "recreate"
+# deletes the file and runs project2.sql plus every migration again
+CLEAR_MODE = os.environ.get('CLEAR_MODE', 'template')
+if CLEAR_MODE not in ('template', 'recreate'):
+    raise ValueError(f"unknown CLEAR_MODE {CLEAR_MODE!r} (expected template or recreate)")
+schema_template = SchemaTemplate(sql_file)
+
+# "file" serves project2.db directly; "memory" serves an in-memory copy of it
+# (loaded at startup, written back every SNAPSHOT_INTERVAL seconds and at
+# exit), so requests never wait on disk.  The in-memory database belongs to
+# one process, so use a single worker process with it.
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'file')
+if STORAGE_MODE not in ('file', 'memory'):
+    raise ValueError(f"unknown STORAGE_MODE {STORAGE_MODE!r} (expected file or memory)")
+SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', '30'))
+memory_store = MemoryStore(db_name, interval=SNAPSHOT_INTERVAL) if STORAGE_MODE == 'memory' else None
+
+# Connection pool sizing (per worker process)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5.0'))
+DB_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', '256'))
+
+# SQLite tuning preset ("durable", "balanced", "benchmark"), see db_profiles.py
+DB_PROFILE_NAME, DB_PROFILE = load_profile()
+db_profile_effective = None
+
+# In-memory indexes derived from the database (per worker process; each is
+# rebuilt from the database on first use).  They share one lock, which
+# writers hold across their commit so updates are applied in commit order.
+# Writes made by other worker processes are noticed through the shared
+# counters in data_versions, and the affected indexes rebuilt.
+LEADERBOARD_ENABLED = os.environ.get('LEADERBOARD_ENABLED', '1') == '1'
+INGREDIENT_INDEX_ENABLED = os.environ.get('INGREDIENT_INDEX_ENABLED', '1') == '1'
+derived_lock = threading.RLock()
+data_versions = DataVersions(lock=derived_lock)
+popular_board = PopularLeaderboard(lock=derived_lock)
+data_versions.depend(("recipes", "likes"), popular_board.invalidate)
+ingredient_index = IngredientIndex(lock=derived_lock)
+data_versions.depend(("recipes",), ingredient_index.invalidate)
+
+# recipe_id -> (seq, like_count) used to answer If-None-Match on /view_recipe
+# with one read of the shared counters instead of the recipe; per worker
+# process like the indexes above, 0 disables
+RECIPE_VERSION_CACHE_SIZE = int(os.environ.get('RECIPE_VERSION_CACHE_SIZE', '100000'))
+recipe_versions = RecipeVersions(max_size=RECIPE_VERSION_CACHE_SIZE)
+data_versions.depend(("recipes", "likes"), recipe_versions.clear)
+
+# Feed timelines: entries kept per user, and the follower count above which an
+# author's recipes are pulled at read time instead of fanned out on write
+FEED_TIMELINE_LENGTH = int(os.environ.get('FEED_TIMELINE_LENGTH', '200'))
+FEED_PULL_THRESHOLD = int(os.environ.get('FEED_PULL_THRESHOLD', '10000'))
+
+# /search pagination: the largest page size honoured for `limit` (larger
+# values are cut down to it)
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '100'))
+
+# Bulk recipe ingestion: recipes written per transaction, and the largest
+# accepted body (catalog imports are far bigger than ordinary requests)
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '1000'))
+BULK_MAX_BODY_BYTES = int(os.environ.get('BULK_MAX_BODY_BYTES', str(64 * 1024 * 1024)))
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+# Password hashing: KDF for new hashes ("sha256", the original format,
+# "pbkdf2" or "scrypt"; older formats are upgraded on login) and the bounded
+# pool the expensive ones run on
+password_hasher = PasswordHasher(
+    kdf=os.environ.get('PASSWORD_KDF', 'sha256'),
+    pbkdf2_iterations=int(os.environ.get('PBKDF2_ITERATIONS', '600000')),
+    scrypt_n=int(os.environ.get('SCRYPT_N', str(2 ** 14))),
+    scrypt_r=int(os.environ.get('SCRYPT_R', '8')),
+    scrypt_p=int(os.environ.get('SCRYPT_P', '1')),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '16')),
+    timeout=float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10')),
+)
+
+# Read the secret key from key.txt (SIGHUP re-reads it, see start_serving)
+key_file = 'key.txt'
+with open(key_file, 'r') as f:
     SECRET_KEY = f.read().strip()
 
+# The JWT header never changes, so encode it once
+JWT_HEADER_ENCODED = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode()).decode()
+# Keyed HMAC state, copied per token instead of re-deriving the key pads
+jwt_hmac = hmac.new(SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+# Seconds tokens signed with the previous key are still accepted after a
+# key rotation, so clients can log in again; 0 rejects them at once
+JWT_KEY_GRACE_SECONDS = float(os.environ.get('JWT_KEY_GRACE_SECONDS', '3600'))
+# (keyed HMAC state, monotonic expiry) of the previous key, or None
+previous_jwt_hmac = None
+key_rotations = 0
+
+# Verified tokens (keyed by digest) -> claims; 0 disables the cache
+JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '10000'))
+jwt_cache = TokenCache(max_size=JWT_CACHE_SIZE)
+
+# Token format issued by /login: 1 = {"username"}, 2 = {"username", "uid"}.
+# Both are accepted whatever the setting.
+JWT_VERSION = int(os.environ.get('JWT_VERSION', '1'))
+# username -> users.id for authenticated requests; 0 disables the cache.
+# Emptied when another process creates or deletes an account (or resets
+# the database), which the shared counters tell.
+USER_ID_CACHE_SIZE = int(os.environ.get('USER_ID_CACHE_SIZE', '10000'))
+USER_ID_CACHE_TTL = float(os.environ.get('USER_ID_CACHE_TTL', '300'))
+user_id_cache = UserIdCache(max_size=USER_ID_CACHE_SIZE, ttl=USER_ID_CACHE_TTL)
+data_versions.depend(("users",), user_id_cache.clear)
+
+# Prometheus metrics at /metrics: per-endpoint histograms of handler time,
+# time in SQLite (statements, fetches and commits), JSON serialization time
+# and statements per request.  Off by default; when off nothing is timed.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+request_metrics = RequestMetrics()
+
+# Slow-query log: statements taking at least SLOW_QUERY_MS (executing plus
+# fetching their rows) are written with their EXPLAIN QUERY PLAN to the
+# rotating file SLOW_QUERY_LOG by a background thread.  Empty disables it.
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', '')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '5'))
+
+def connect_db():
+    """Unpooled connection to the database requests are served from"""
+    if memory_store is not None:
+        return memory_store.connect()
+    return sqlite3.connect(db_name)
+
+def schema_guard():
+    """Cross-process schema lock; an in-memory database belongs to this process alone"""
+    return schema_lock(db_name) if memory_store is None else nullcontext()
+
+def build_schema(conn):
+    """Replace whatever conn's database holds with the empty, migrated schema"""
+    # An in-memory database cannot be deleted and rebuilt, so it is always
+    # reset from the template
+    if CLEAR_MODE == 'template' or memory_store is not None:
+        schema_template.restore(conn)
+    else:
+        with open(sql_file, 'r') as sql_startup:
+            init_db = sql_startup.read()
+        cursor = conn.cursor()
+        cursor.executescript(init_db)
+        conn.commit()
+        # Bring the fresh version 0 schema up to date (indexes etc.)
+        migrate(conn)
+    # Other processes must not take the empty database's counters for the old ones
+    new_generation(conn)
+
 def create_db():
-    """Create database from SQL file"""
-    conn = sqlite3.connect(db_name)
-    
-    with open(sql_file, 'r') as sql_startup:
-        init_db = sql_startup.read()
-    cursor = conn.cursor()
-    cursor.executescript(init_db)
-    conn.commit()
-    conn.close()
+    """Create database from SQL file (or reset it in place from the template)"""
+    with schema_guard():
+        conn = connect_db()
+        try:
+            build_schema(conn)
+        finally:
+            conn.close()
     global db_flag
     db_flag = True
 
-def get_db():
-    """Get database connection, creating if necessary"""
-    if not db_flag:
-        create_db()
-    conn = sqlite3.connect(db_name)
+def init_db():
+    """Create the schema if the database has none, otherwise migrate it; never drops data.
+
+    Runs once at import, before any request is served.  The schema lock
+    serializes worker processes starting together, and every one after the
+    first only reads PRAGMA user_version.
+    """
+    with schema_guard():
+        conn = connect_db()
+        try:
+            if schema_version(conn) < LATEST_VERSION:
+                if has_schema(conn):
+                    migrate(conn)
+                else:
+                    build_schema(conn)
+        finally:
+            conn.close()
+    global db_flag
+    db_flag = True
+
+def configure_connection(conn):
+    """Per-connection setup applied once when the pool opens a connection"""
+    global db_profile_effective
     # Enable foreign keys
     conn.execute("PRAGMA foreign_keys = ON")
+    apply_profile(conn, DB_PROFILE)
+    if db_profile_effective is None:
+        db_profile_effective = read_effective(conn)
+        app.logger.info("SQLite storage profile %s: %s", DB_PROFILE_NAME, db_profile_effective)
+
+def remove_db_files():
+    """Delete the database file together with its WAL and shared-memory files"""
+    for path in (db_name, db_name + "-wal", db_name + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+if memory_store is None:
+    db_pool = ConnectionPool(db_name, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                             setup=configure_connection, cached_statements=DB_STATEMENT_CACHE)
+else:
+    db_pool = ConnectionPool(memory_store.uri, uri=True, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                             setup=configure_connection, cached_statements=DB_STATEMENT_CACHE)
+
+# WSGI environ key under which a server (see asgi.py) may pass an
+# InterruptScope used to cancel the request's database work
+INTERRUPT_SCOPE_KEY = 'meals.interrupt_scope'
+
+def get_db():
+    """Get a pooled database connection.
+
+    Calling close() on the returned connection hands it back to the pool.
+    """
+    if not db_flag:
+        # Only while /clear is recreating the file
+        init_db()
+    conn = db_pool.acquire()
+    if has_request_context():
+        scope = request.environ.get(INTERRUPT_SCOPE_KEY)
+        if scope is not None:
+            scope.attach(conn)
     return conn
 
+def count_statement(sql, params, seconds):
+    """Pool tracer: count the SQL statements run on behalf of the current request"""
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+
+def time_statement(sql, params, seconds):
+    """Pool tracer with metrics on: count statements and add up their time"""
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+
+def time_database(seconds):
+    """Pool time tracer: time spent fetching rows and committing"""
+    if has_request_context():
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+
+if METRICS_ENABLED:
+    db_pool.tracer = time_statement
+    db_pool.time_tracer = time_database
+else:
+    db_pool.tracer = count_statement
+
+def endpoint_label():
+    """The current request's URL rule, which unlike its path is a bounded set"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+def log_slow_statement(sql, params, seconds):
+    """Pool statement tracer: queue statements over the threshold for the slow-query log"""
+    if seconds >= slow_query_log.threshold:
+        if has_request_context():
+            slow_query_log.record(sql, params, seconds, endpoint_label(), request.method)
+        else:
+            slow_query_log.record(sql, params, seconds)
+
+if SLOW_QUERY_LOG:
+    slow_query_log = SlowQueryLog(SLOW_QUERY_LOG, SLOW_QUERY_MS / 1000, connect_db,
+                                  max_bytes=SLOW_QUERY_LOG_BYTES, backups=SLOW_QUERY_LOG_BACKUPS)
+    slow_query_log.start()
+    atexit.register(slow_query_log.stop)
+    db_pool.statement_tracer = log_slow_statement
+else:
+    slow_query_log = None
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds serialization time to the request's metrics"""
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context():
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g.json_seconds = g.get('json_seconds', 0.0) + time.perf_counter() - started
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def observe_request(response):
+    """Record the finished request in the per-endpoint metrics"""
+    started = g.get('request_started')
+    if started is not None:
+        request_metrics.observe(
+            endpoint_label(), request.method, response.status_code,
+            time.perf_counter() - started, g.get('sql_seconds', 0.0), g.get('json_seconds', 0.0),
+            g.get('sql_statements', 0))
+    return response
+
+if METRICS_ENABLED:
+    app.json = TimedJSONProvider(app)
+    app.before_request(start_request_timer)
+    app.after_request(observe_request)
+
+def stop_memory_store():
+    """Final snapshot of the in-memory database"""
+    try:
+        memory_store.stop()
+    except Exception as e:
+        app.logger.error("Final snapshot of %s failed: %s", db_name, e)
+
+# Create or migrate the database before the first request, never on one
+if memory_store is not None:
+    memory_store.load()
+init_db()
+
+serving = False
+serving_lock = threading.Lock()
+
+def start_serving():
+    """Start what belongs to the serving process alone; call once from its main thread.
+
+    Importing app (scripts, tools, tests) only loads the database.  The
+    server also snapshots the in-memory database back to disk, on an
+    interval and at exit, and reloads key.txt on SIGHUP.
+    """
+    global serving
+    with serving_lock:
+        if serving:
+            return
+        serving = True
+    if memory_store is not None:
+        memory_store.start()
+    atexit.register(stop_serving)
+    install_key_reload()
+
+def stop_serving():
+    """Take the final snapshot; runs at exit, or earlier from a server's shutdown hook"""
+    global serving
+    with serving_lock:
+        if not serving:
+            return
+        serving = False
+    if memory_store is not None:
+        stop_memory_store()
+
+@app.after_request
+def report_statement_count(response):
+    """Expose the per-request SQL statement count"""
+    response.headers['X-SQL-Statements'] = str(g.get('sql_statements', 0))
+    return response
+
+def reset_derived_state():
+    """Drop in-memory structures derived from the database"""
+    data_versions.reset()
+    popular_board.invalidate()
+    ingredient_index.invalidate()
+    recipe_versions.clear()
+    user_id_cache.clear()
+
+def refresh_derived(cursor):
+    """data_versions.refresh(), at most once per request.
+
+    Checking the shared counters at the start of a request is enough for
+    its reads; later callers in the same request reuse that check.
+    """
+    if has_request_context():
+        if g.get('data_versions_refreshed'):
+            return
+        g.data_versions_refreshed = True
+    data_versions.refresh(cursor)
+
+def commit_derived(conn, apply, changed):
+    """Commit, then apply in-memory index updates in the same order as the commits.
+
+    changed names the kinds of data the transaction wrote ("recipes",
+    "likes", "users"); their shared counters are bumped before the commit so other
+    processes notice.  Unbuilt (or disabled) indexes ignore the updates and
+    pick the change up when they are built.
+    """
+    counters = data_versions.bump(conn.cursor(), changed) if changed else None
+    with derived_lock:
+        conn.commit()
+        if counters is not None:
+            data_versions.advance(counters, changed)
+        apply()
+
+# Id lists are passed as one JSON array parameter and expanded with json_each,
+# so a batch costs one statement whatever its size and never hits SQLite's
+# bound-parameter limit.
+
+def fetch_recipes_by_id(cursor, recipe_ids):
+    """Fetch (recipe_id, name, description, like_count) rows in the given order"""
+    if not recipe_ids:
+        return []
+    cursor.execute("""
+        SELECT recipe_id, name, description, like_count
+        FROM recipes
+        WHERE recipe_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(recipe_ids),))
+    rows = {row[0]: row for row in cursor.fetchall()}
+    return [rows[recipe_id] for recipe_id in recipe_ids if recipe_id in rows]
+
+# Keyset shape per /search mode: feed (created_at, seq), popular
+# (likes, created_at, seq), ingredients (recipe_id,)
+SEARCH_CURSOR_TYPES = {
+    "feed": (str, int),
+    "popular": (int, str, int),
+    "ingredients": (int,),
+}
+
+def encode_search_cursor(mode, key):
+    """Opaque next_cursor token: the mode and the last ordering key shown"""
+    raw = json.dumps([mode] + list(key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_search_cursor(token, mode):
+    """Ordering key from a next_cursor token; ValueError if it is malformed or for another mode"""
+    try:
+        value = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("malformed cursor")
+    types = SEARCH_CURSOR_TYPES[mode]
+    if (not isinstance(value, list) or len(value) != len(types) + 1 or value[0] != mode
+            or not all(type(part) is kind for part, kind in zip(value[1:], types))):
+        raise ValueError("malformed cursor")
+    return tuple(value[1:])
+
+def parse_page_limit(value):
+    """The `limit` query parameter: None if absent, at most SEARCH_MAX_LIMIT, ValueError unless a positive integer"""
+    if value is None:
+        return None
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, SEARCH_MAX_LIMIT)
+
+def fetch_ingredients(cursor, recipe_ids):
+    """Map each recipe id to its sorted ingredient list in a single query"""
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    if not recipe_ids:
+        return ingredients
+    cursor.execute("""
+        SELECT recipe_id, ingredient
+        FROM recipe_ingredients
+        WHERE recipe_id IN (SELECT value FROM json_each(?))
+        ORDER BY recipe_id, ingredient
+    """, (json.dumps(recipe_ids),))
+    for recipe_id, ingredient in cursor.fetchall():
+        ingredients[recipe_id].append(ingredient)
+    return ingredients
+
+def parse_recipe_fields(name, description, recipe_id, ingredients):
+    """Validate create_recipe input.
+
+    Returns (recipe_id, ingredients_list) or None if the recipe must be
+    rejected before touching the database.  ingredients is the JSON text
+    of the ingredient list; ingredients_list is None when there are none.
+    """
+    # Validate required fields
+    if not all([name, description, recipe_id]):
+        return None
+    
+    # Convert recipe_id to int (and keep it within SQLite's INTEGER range)
+    try:
+        recipe_id = int(recipe_id)
+    except:
+        return None
+    if not -2**63 <= recipe_id < 2**63:
+        return None
+    
+    # Parse ingredients if provided
+    ingredients_list = None
+    if ingredients:
+        try:
+            ingredients_list = json.loads(ingredients)
+        except:
+            return None
+    if ingredients_list:
+        try:
+            ingredients_list = list(ingredients_list)
+        except:
+            return None
+    return recipe_id, ingredients_list
+
+def read_bulk_items():
+    """Items of a bulk request: a JSON array body, or one JSON value per line (NDJSON).
+
+    NDJSON is decoded line by line as it is read; returns None for any
+    other body.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        stream = request.stream
+        # werkzeug's LimitedStream is unbuffered, so readline() would read byte by byte
+        if isinstance(stream, io.RawIOBase):
+            stream = io.BufferedReader(stream, 64 * 1024)
+        return ndjson_items(stream)
+    body = request.get_json(silent=True)
+    if not isinstance(body, list):
+        return None
+    return body
+
+def ndjson_items(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except:
+            yield None
+
+def parse_bulk_item(item):
+    """Validate one bulk item; returns (recipe_id, name, description, ingredients_list) or None"""
+    if not isinstance(item, dict):
+        return None
+    ingredients = item.get('ingredients')
+    # Bulk items may give the list itself instead of its JSON text
+    if isinstance(ingredients, list):
+        ingredients = json.dumps(ingredients)
+    fields = parse_recipe_fields(item.get('name'), item.get('description'), item.get('recipe_id'), ingredients)
+    if fields is None:
+        return None
+    return fields[0], item['name'], item['description'], fields[1]
+
+def insert_recipes(cursor, user_id, recipes):
+    """Insert (recipe_id, name, description, ingredients_list) tuples by one author.
+
+    All rows go in with executemany; if any of them is rejected, the batch
+    is retried one recipe at a time so only the offending recipes fail.
+    Must run inside a transaction.  Returns the recipes that were written.
+    """
+    cursor.execute("SAVEPOINT bulk_batch")
+    try:
+        cursor.executemany("""
+            INSERT INTO recipes (recipe_id, user_id, name, description)
+            VALUES (?, ?, ?, ?)
+        """, [(recipe_id, user_id, name, description) for recipe_id, name, description, _ in recipes])
+        cursor.executemany("""
+            INSERT INTO recipe_ingredients (recipe_id, ingredient)
+            VALUES (?, ?)
+        """, [(recipe[0], ingredient) for recipe in recipes for ingredient in recipe[3] or ()])
+        cursor.execute("RELEASE bulk_batch")
+        return recipes
+    except:
+        cursor.execute("ROLLBACK TO bulk_batch")
+        cursor.execute("RELEASE bulk_batch")
+    written = []
+    for recipe in recipes:
+        recipe_id, name, description, ingredients_list = recipe
+        cursor.execute("SAVEPOINT bulk_recipe")
+        try:
+            cursor.execute("""
+                INSERT INTO recipes (recipe_id, user_id, name, description)
+                VALUES (?, ?, ?, ?)
+            """, (recipe_id, user_id, name, description))
+            if ingredients_list:
+                cursor.executemany("""
+                    INSERT INTO recipe_ingredients (recipe_id, ingredient)
+                    VALUES (?, ?)
+                """, [(recipe_id, ingredient) for ingredient in ingredients_list])
+            cursor.execute("RELEASE bulk_recipe")
+            written.append(recipe)
+        except:
+            cursor.execute("ROLLBACK TO bulk_recipe")
+            cursor.execute("RELEASE bulk_recipe")
+    return written
+
+def write_recipe_chunk(conn, cursor, user_id, pending, statuses):
+    """Create the (index, recipe) items of one chunk in a single transaction.
+
+    Sets statuses[index] to 1 for every recipe written.  Only the first
+    item of each recipe_id is attempted; the later ones are returned so
+    they are tried after it, just as successive /create_recipe calls.
+    """
+    chunk, deferred = {}, []
+    for index, recipe in pending:
+        if recipe[0] in chunk:
+            deferred.append((index, recipe))
+        else:
+            chunk[recipe[0]] = (index, recipe)
+    
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("""
+        SELECT recipe_id FROM recipes
+        WHERE recipe_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(chunk)),))
+    existing = {row[0] for row in cursor.fetchall()}
+    written = insert_recipes(cursor, user_id, [recipe for recipe_id, (_, recipe) in chunk.items()
+                                               if recipe_id not in existing])
+    if not written:
+        conn.rollback()
+        return deferred
+    
+    # Insertion order and timestamps for the feed and the leaderboard
+    written_ids = json.dumps([recipe[0] for recipe in written])
+    cursor.execute("""
+        INSERT INTO recipe_inserts (recipe_id)
+        SELECT value FROM json_each(?) ORDER BY key
+    """, (written_ids,))
+    cursor.execute("""
+        SELECT r.recipe_id, r.created_at, ri.seq
+        FROM recipes r
+        JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+        WHERE r.recipe_id IN (SELECT value FROM json_each(?))
+        ORDER BY ri.seq
+    """, (written_ids,))
+    entries = cursor.fetchall()
+    timelines.fan_out_many(cursor, user_id, entries, FEED_TIMELINE_LENGTH, FEED_PULL_THRESHOLD)
+    
+    def apply():
+        for recipe_id, created_at, seq in entries:
+            popular_board.add(recipe_id, 0, created_at, seq)
+        for recipe_id, _, _, ingredients_list in written:
+            if ingredients_list:
+                ingredient_index.add(recipe_id, ingredients_list)
+        recipe_versions.invalidate([recipe[0] for recipe in written])
+    commit_derived(conn, apply, ("recipes",))
+    for recipe in written:
+        statuses[chunk[recipe[0]][0]] = 1
+    return deferred
+
+def recipe_etag(recipe_id, version, mask):
+    """Entity tag of a /view_recipe response; mask is the set of requested fields"""
+    seq, like_count = version
+    # The like count only matters when likes were requested
+    if mask & 4:
+        return f"{recipe_id}.{seq}.{mask}.{like_count}"
+    return f"{recipe_id}.{seq}.{mask}"
+
+def mark_revalidatable(response, etag):
+    """Let shared caches store the response despite Authorization, revalidating on each use"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+def not_modified(etag):
+    return mark_revalidatable(app.response_class(status=304), etag)
+
 def hash_password(password, salt):
-    """Hash password using SHA-256 with salt"""
-    combined = password + salt
-    return hashlib.sha256(combined.encode()).hexdigest()
+    """Hash password with salt using the configured KDF (SHA-256 by default)"""
+    return password_hasher.hash(password, salt)
+
+def overloaded(body):
+    """Failure response for a request turned away by the password hashing pool"""
+    response = jsonify(body)
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def rotate_secret_key(new_key):
+    """Switch the JWT signing key; tokens verified under the old key are forgotten.
+
+    Tokens signed with the old key keep verifying (uncached) for
+    JWT_KEY_GRACE_SECONDS.
+    """
+    global SECRET_KEY, jwt_hmac, previous_jwt_hmac, key_rotations
+    if JWT_KEY_GRACE_SECONDS > 0:
+        previous_jwt_hmac = (jwt_hmac, time.monotonic() + JWT_KEY_GRACE_SECONDS)
+    else:
+        previous_jwt_hmac = None
+    SECRET_KEY = new_key
+    jwt_hmac = hmac.new(SECRET_KEY.encode(), digestmod=hashlib.sha256)
+    jwt_cache.clear()
+    key_rotations += 1
+
+def reload_secret_key():
+    """Rotate to the key now in key.txt if it changed"""
+    try:
+        with open(key_file, 'r') as f:
+            new_key = f.read().strip()
+    except OSError as e:
+        app.logger.error("Reloading %s failed: %s", key_file, e)
+        return
+    if not new_key:
+        app.logger.error("Not rotating to the empty key in %s", key_file)
+        return
+    if new_key != SECRET_KEY:
+        rotate_secret_key(new_key)
+        app.logger.warning("JWT key rotated from %s", key_file)
+
+def install_key_reload():
+    """Reload key.txt on SIGHUP (only the main thread can install signal handlers)"""
+    if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_secret_key())
+
+def signed_by_previous_key(message, signature):
+    """True if signature is the previous key's and its grace period is still running"""
+    previous = previous_jwt_hmac
+    if previous is None or time.monotonic() >= previous[1]:
+        return False
+    mac = previous[0].copy()
+    mac.update(message.encode())
+    return hmac.compare_digest(signature, mac.hexdigest())
 
-def generate_jwt(username):
-    """Generate JWT token - payload only contains username"""
-    header = {"alg": "HS256", "typ": "JWT"}
+def sign_jwt(message):
+    """Hex HMAC-SHA256 signature of a JWT signing input"""
+    mac = jwt_hmac.copy()
+    mac.update(message.encode())
+    return mac.hexdigest()
+
+def generate_jwt(username, user_id=None):
+    """Generate JWT token - payload contains username (and the user id in v2)"""
     payload = {"username": username}
+    if JWT_VERSION >= 2 and user_id is not None:
+        payload["uid"] = user_id
     
-    # Encode header and payload
-    header_encoded = base64.urlsafe_b64encode(json.dumps(header).encode()).decode()
+    # Encode payload (the header is pre-encoded)
     payload_encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
     
     # Create signature
-    message = f"{header_encoded}.{payload_encoded}"
-    signature = hmac.new(SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+    message = f"{JWT_HEADER_ENCODED}.{payload_encoded}"
+    signature = sign_jwt(message)
     
-    return f"{header_encoded}.{payload_encoded}.{signature}"
+    return f"{message}.{signature}"
 
 def verify_jwt(token):
     """Verify JWT token and return username if valid"""
+    claims = verify_jwt_claims(token)
+    return claims['username'] if claims else None
+
+def verify_jwt_claims(token):
+    """Verify JWT token and return its payload if valid"""
     try:
+        # Tokens seen before skip the HMAC, base64 and JSON work
+        digest = token_digest(token)
+        cached = jwt_cache.get(digest)
+        if cached is not None:
+            return cached
+        generation = jwt_cache.generation
+        
         parts = token.split('.')
         if len(parts) != 3:
             return None
@@ -73,17 +773,56 @@ def verify_jwt(token):
         
         # Verify signature
         message = f"{header_encoded}.{payload_encoded}"
-        expected_signature = hmac.new(SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+        expected_signature = sign_jwt(message)
         
-        if not hmac.compare_digest(signature, expected_signature):
+        current_key = hmac.compare_digest(signature, expected_signature)
+        if not current_key and not signed_by_previous_key(message, signature):
             return None
             
         # Decode payload
         payload = json.loads(base64.urlsafe_b64decode(payload_encoded).decode())
-        return payload.get('username')
+        username = payload.get('username')
+        if not username:
+            return None
+        # Old-key tokens are not cached, so they stop working when the grace period ends
+        if current_key:
+            jwt_cache.put(digest, username, payload, generation)
+        return payload
     except:
         return None
 
+def resolve_user_id(cursor, claims):
+    """Map verified token claims to a users.id, avoiding the users table if possible.
+
+    The username goes through the username cache, which is only trusted
+    after the shared counters are checked: an account created or deleted
+    by another process (or a /clear there) empties it.  v2 tokens also
+    carry the id, which must be the username's: ids are never reused (see
+    migration 4; only /clear starts them over), so a token issued to a deleted account stays rejected
+    after the username is taken again.  A cached id that disagrees with
+    the token is checked against the database.  The uid alone is never
+    trusted, so a cache miss reads users for v2 tokens too.  Returns None
+    for unknown users and for tokens of other accounts.
+    """
+    uid = claims.get('uid')
+    if type(uid) is not int:
+        uid = None
+    username = claims['username']
+    user_id = user_id_cache.get(username)
+    if user_id is not None:
+        refresh_derived(cursor)
+        user_id = user_id_cache.get(username)
+    if user_id is None or (uid is not None and user_id != uid):
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        user_data = cursor.fetchone()
+        if not user_data:
+            return None
+        user_id = user_data[0]
+        user_id_cache.put(username, user_id)
+    if uid is not None and user_id != uid:
+        return None
+    return user_id
+
 def validate_password(password, username, first_name, last_name):
     """Validate password against requirements"""
     # 1. At least 8 characters
@@ -116,6 +855,16 @@ def validate_password(password, username, first_name, last_name):
     
     return True
 
+def get_list_param(params, param_name):
+    """A list parameter, given as a JSON array (JSON body) or as its JSON text"""
+    value = params.get(param_name)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except:
+            return None
+    return value if isinstance(value, list) else None
+
 def get_jwt_from_header():
     """Extract JWT from Authorization header"""
     auth_header = request.headers.get('Authorization')
@@ -123,51 +872,82 @@ def get_jwt_from_header():
         return None
     return auth_header
 
-def get_post_param(param_name):
-    """Robustly extract a POST parameter from form, JSON, or raw body."""
-    # 1) Standard form field
-    value = request.form.get(param_name)
-    if value is not None and value != "":
-        return value
-    # 2) JSON body
-    try:
-        json_body = request.get_json(silent=True)
-        if isinstance(json_body, dict) and param_name in json_body and json_body[param_name] != "":
-            return json_body[param_name]
-    except:
-        pass
-    # 3) URL-encoded raw body fallback
-    try:
-        from urllib.parse import parse_qs
-        raw = request.get_data(as_text=True) or ""
-        parsed = parse_qs(raw, keep_blank_values=True)
-        if param_name in parsed and len(parsed[param_name]) > 0:
-            return parsed[param_name][0]
-    except:
-        pass
-    return None
+class PostParams:
+    """POST parameters of one request, parsed in a single pass.
+
+    Lookups follow the order get_post_param always used: a non-empty form
+    field, then a non-empty key of a JSON object body, then the raw body
+    parsed as a query string.  Each source is decoded at most once.
+    """
+
+    def __init__(self, req):
+        self._req = req
+        self.form = req.form
+        self.json = None
+        if req.is_json:
+            try:
+                json_body = req.get_json(silent=True)
+                if isinstance(json_body, dict):
+                    self.json = json_body
+            except:
+                pass
+        self._raw = None
+
+    @property
+    def raw(self):
+        """The body parsed as a query string, decoded on first use"""
+        if self._raw is None:
+            try:
+                self._raw = parse_qs(self._req.get_data(as_text=True) or "", keep_blank_values=True)
+            except:
+                self._raw = {}
+        return self._raw
+
+    def get(self, param_name):
+        # 1) Standard form field
+        value = self.form.get(param_name)
+        if value is not None and value != "":
+            return value
+        # 2) JSON body
+        if self.json is not None and param_name in self.json and self.json[param_name] != "":
+            return self.json[param_name]
+        # 3) URL-encoded raw body fallback
+        values = self.raw.get(param_name)
+        if values:
+            return values[0]
+        return None
+
+def get_params():
+    """The current request's PostParams, parsed on first use"""
+    params = g.get('post_params')
+    if params is None:
+        params = g.post_params = PostParams(request)
+    return params
 
 @app.route('/clear', methods=['GET'])
 def clear_db():
     """Clear the database and recreate tables"""
     conn = None
     try:
-        # Close any open connections first
-        # Reset the database flag so it gets recreated
         global db_flag
+        if (CLEAR_MODE == 'template' or memory_store is not None) and db_flag:
+            # Overwrite the live file with the empty schema; the pooled
+            # connections stay open and see it on their next statement
+            create_db()
+            reset_derived_state()
+            jwt_cache.clear()
+            return jsonify({"status": 1})
+        
+        # Reset the database flag so it gets recreated
         db_flag = False
         
-        # Try to close any existing connections by attempting to connect and close
-        try:
-            if os.path.exists(db_name):
-                temp_conn = sqlite3.connect(db_name)
-                temp_conn.close()
-        except:
-            pass
+        # Drop pooled connections so none keeps pointing at the removed file
+        db_pool.reset()
         
         # Remove the database file (as per spec: "It is recommended that you simply delete the .db file")
-        if os.path.exists(db_name):
-            os.remove(db_name)
+        remove_db_files()
+        reset_derived_state()
+        jwt_cache.clear()
         
         # Create fresh database
         create_db()
@@ -181,25 +961,80 @@ def clear_db():
                 pass
         # Even on error, try to recreate database
         try:
-            if os.path.exists(db_name):
-                os.remove(db_name)
+            db_pool.reset()
+            if memory_store is None:
+                remove_db_files()
+            reset_derived_state()
+            jwt_cache.clear()
             db_flag = False
             create_db()
         except:
             pass
         return jsonify({"status": 1})
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Report runtime counters for this worker process"""
+    previous = previous_jwt_hmac
+    return jsonify({"status": 1, "data": {
+        "pid": os.getpid(),
+        "pool": db_pool.stats(),
+        "jwt_cache": jwt_cache.stats(),
+        "jwt_key": {"rotations": key_rotations,
+                    "previous_valid_for": max(0.0, round(previous[1] - time.monotonic(), 3)) if previous else 0.0},
+        "user_id_cache": user_id_cache.stats(),
+        "recipe_versions": recipe_versions.stats(),
+        "data_versions": data_versions.stats(),
+        "password_hashing": password_hasher.stats(),
+        "clear": {"mode": CLEAR_MODE, "template_restores": schema_template.restores},
+        "slow_queries": slow_query_log.stats() if slow_query_log is not None else None,
+        "storage": {"mode": STORAGE_MODE,
+                    "snapshots": memory_store.stats() if memory_store is not None else None},
+        "storage_profile": {"name": DB_PROFILE_NAME, "settings": DB_PROFILE,
+                            "effective": db_profile_effective},
+    }})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-endpoint request metrics in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        return jsonify({"status": 2, "data": "NULL"}), 404
+    return app.response_class(request_metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/consistency', methods=['GET'])
+def consistency():
+    """Compare in-memory derived structures against the database"""
+    conn = None
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        data = {}
+        refresh_derived(cursor)
+        if LEADERBOARD_ENABLED:
+            popular_board.ensure_built(cursor)
+            data['popular'] = popular_board.check(cursor)
+        if INGREDIENT_INDEX_ENABLED:
+            ingredient_index.ensure_built(cursor)
+            data['ingredients'] = ingredient_index.check(cursor)
+        conn.close()
+        return jsonify({"status": 1, "data": data})
+    except Exception as e:
+        if conn:
+            conn.close()
+        return jsonify({"status": 2, "data": "NULL"})
+
 @app.route('/create_user', methods=['POST'])
 def create_user():
     """Create a new user"""
     conn = None
     try:
-        first_name = get_post_param('first_name')
-        last_name = get_post_param('last_name')
-        username = get_post_param('username')
-        email_address = get_post_param('email_address')
-        password = get_post_param('password')
-        salt = get_post_param('salt')
+        params = get_params()
+        first_name = params.get('first_name')
+        last_name = params.get('last_name')
+        username = params.get('username')
+        email_address = params.get('email_address')
+        password = params.get('password')
+        salt = params.get('salt')
         
         # Validate required fields
         if not all([first_name, last_name, username, email_address, password, salt]):
@@ -213,29 +1048,33 @@ def create_user():
         if not validate_password(password, username, first_name, last_name):
             return jsonify({"status": 4, "pass_hash": "NULL"})
         
+        # Hash the password before touching the database
+        try:
+            pass_hash = hash_password(password, salt)
+        except HashingOverloaded:
+            return overloaded({"status": 4, "pass_hash": "NULL"})
+        
         conn = get_db()
         cursor = conn.cursor()
         
-        # Check if username already exists
-        cursor.execute("SELECT username FROM users WHERE username = ?", (username,))
-        if cursor.fetchone():
+        # Insert user; the UNIQUE constraints replace the existence checks.
+        # The upsert target is checked first, so a taken username wins over
+        # a taken email address just like the old SELECT order.
+        try:
+            cursor.execute("""
+                INSERT INTO users (first_name, last_name, username, email_address, pass_hash, salt)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (username) DO NOTHING
+            """, (first_name, last_name, username, email_address, pass_hash, salt))
+        except sqlite3.IntegrityError as e:
             conn.close()
-            return jsonify({"status": 2, "pass_hash": "NULL"})
-        
-        # Check if email already exists
-        cursor.execute("SELECT email_address FROM users WHERE email_address = ?", (email_address,))
-        if cursor.fetchone():
+            if 'email_address' in str(e):
+                return jsonify({"status": 3, "pass_hash": "NULL"})
+            return jsonify({"status": 4, "pass_hash": "NULL"})
+        if cursor.rowcount == 0:
+            # Username already exists
             conn.close()
-            return jsonify({"status": 3, "pass_hash": "NULL"})
-        
-        # Hash the password
-        pass_hash = hash_password(password, salt)
-        
-        # Insert user
-        cursor.execute("""
-            INSERT INTO users (first_name, last_name, username, email_address, pass_hash, salt)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (first_name, last_name, username, email_address, pass_hash, salt))
+            return jsonify({"status": 2, "pass_hash": "NULL"})
         
         # Get the user ID for password history
         user_id = cursor.lastrowid
@@ -246,7 +1085,8 @@ def create_user():
             VALUES (?, ?)
         """, (user_id, pass_hash))
         
-        conn.commit()
+        # Other processes drop their cached ids when accounts come and go
+        commit_derived(conn, lambda: None, ("users",))
         conn.close()
         
         return jsonify({"status": 1, "pass_hash": pass_hash})
@@ -261,8 +1101,9 @@ def login():
     """Authenticate user and return JWT"""
     conn = None
     try:
-        username = get_post_param('username')
-        password = get_post_param('password')
+        params = get_params()
+        username = params.get('username')
+        password = params.get('password')
         
         if not username or not password:
             return jsonify({"status": 2, "jwt": "NULL"})
@@ -271,26 +1112,43 @@ def login():
         cursor = conn.cursor()
         
         # Get user data
-        cursor.execute("SELECT pass_hash, salt FROM users WHERE username = ?", (username,))
+        cursor.execute("SELECT id, pass_hash, salt FROM users WHERE username = ?", (username,))
         user_data = cursor.fetchone()
         
         if not user_data:
             conn.close()
             return jsonify({"status": 2, "jwt": "NULL"})
         
-        stored_hash, salt = user_data
+        user_id, stored_hash, salt = user_data
+        conn.close()
         
-        # Verify password
-        computed_hash = hash_password(password, salt)
+        # Verify password (off the pooled connection; may run on the hashing pool)
+        try:
+            matches, needs_rehash = password_hasher.verify(password, salt, stored_hash)
+        except HashingOverloaded:
+            return overloaded({"status": 2, "jwt": "NULL"})
         
-        if computed_hash != stored_hash:
-            conn.close()
+        if not matches:
             return jsonify({"status": 2, "jwt": "NULL"})
         
+        # Upgrade a hash made with an older KDF or cost while we know the password
+        if needs_rehash:
+            try:
+                new_hash = hash_password(password, salt)
+                conn = get_db()
+                conn.execute("UPDATE users SET pass_hash = ? WHERE id = ? AND pass_hash = ?",
+                             (new_hash, user_id, stored_hash))
+                conn.commit()
+                conn.close()
+            except:
+                # The login itself succeeded; try again next time
+                if conn:
+                    conn.close()
+        
         # Generate JWT
-        jwt_token = generate_jwt(username)
+        jwt_token = generate_jwt(username, user_id)
+        user_id_cache.put(username, user_id)
         
-        conn.close()
         return jsonify({"status": 1, "jwt": jwt_token})
         
     except Exception as e:
@@ -309,71 +1167,60 @@ def create_recipe():
             return jsonify({"status": 2})
         
         # Verify JWT
-        username = verify_jwt(jwt_token)
-        if not username:
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
             return jsonify({"status": 2})
         
         # Get recipe data from form
-        name = get_post_param('name')
-        description = get_post_param('description')
-        recipe_id = get_post_param('recipe_id')
-        ingredients = get_post_param('ingredients')  # JSON string or None
-        
-        # Validate required fields
-        if not all([name, description, recipe_id]):
-            return jsonify({"status": 2})
-        
-        # Convert recipe_id to int
-        try:
-            recipe_id = int(recipe_id)
-        except:
+        params = get_params()
+        name = params.get('name')
+        description = params.get('description')
+        recipe_id = params.get('recipe_id')
+        ingredients = params.get('ingredients')  # JSON string or None
+        
+        fields = parse_recipe_fields(name, description, recipe_id, ingredients)
+        if fields is None:
             return jsonify({"status": 2})
-        
-        # Parse ingredients if provided
-        ingredients_list = None
-        if ingredients:
-            try:
-                ingredients_list = json.loads(ingredients)
-                # Convert list to JSON string for storage
-                ingredients = json.dumps(ingredients_list)
-            except:
-                return jsonify({"status": 2})
+        recipe_id, ingredients_list = fields
         
         conn = get_db()
         cursor = conn.cursor()
         
-        # Check if recipe_id already exists
-        cursor.execute("SELECT recipe_id FROM recipes WHERE recipe_id = ?", (recipe_id,))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({"status": 2})
-        
-        # Get user ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        if not user_data:
+        # Get user ID (a deleted account fails the foreign key on insert)
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
             conn.close()
             return jsonify({"status": 2})
         
-        user_id = user_data[0]
-        
-        # Insert recipe
+        # Insert recipe; a taken recipe_id fails the primary key (status 2)
         cursor.execute("""
             INSERT INTO recipes (recipe_id, user_id, name, description)
             VALUES (?, ?, ?, ?)
         """, (recipe_id, user_id, name, description))
         # Record insertion order for stable tie-breaking on feed/popular
         cursor.execute("INSERT INTO recipe_inserts (recipe_id) VALUES (?)", (recipe_id,))
+        seq = cursor.lastrowid
         
         # Insert ingredients if provided
         if ingredients_list:
-            for ingredient in ingredients_list:
-                cursor.execute("""
-                    INSERT INTO recipe_ingredients (recipe_id, ingredient)
-                    VALUES (?, ?)
-                """, (recipe_id, ingredient))
-        
-        conn.commit()
+            cursor.executemany("""
+                INSERT INTO recipe_ingredients (recipe_id, ingredient)
+                VALUES (?, ?)
+            """, [(recipe_id, ingredient) for ingredient in ingredients_list])
+        
+        cursor.execute("SELECT created_at FROM recipes WHERE recipe_id = ?", (recipe_id,))
+        created_at = cursor.fetchone()[0]
+        
+        # Push the recipe onto the followers' feed timelines
+        timelines.fan_out(cursor, user_id, recipe_id, created_at, seq,
+                          FEED_TIMELINE_LENGTH, FEED_PULL_THRESHOLD)
+        
+        def apply():
+            popular_board.add(recipe_id, 0, created_at, seq)
+            if ingredients_list:
+                ingredient_index.add(recipe_id, ingredients_list)
+            recipe_versions.invalidate([recipe_id])
+        commit_derived(conn, apply, ("recipes",))
         conn.close()
         
         return jsonify({"status": 1})
@@ -383,6 +1230,62 @@ def create_recipe():
             conn.close()
         return jsonify({"status": 2})
 
+@app.route('/create_recipes', methods=['POST'])
+def create_recipes():
+    """Create many recipes from a JSON array or an NDJSON stream of recipe objects"""
+    conn = None
+    try:
+        # Get JWT from Authorization header
+        jwt_token = get_jwt_from_header()
+        if not jwt_token:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        # Verify JWT
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        request.max_content_length = BULK_MAX_BODY_BYTES
+        items = read_bulk_items()
+        if items is None:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        # Resolve the author once for the whole batch
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
+            conn.close()
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        # One status per item, in input order, with create_recipe's codes
+        statuses = []
+        pending = []
+        try:
+            for item in items:
+                recipe = parse_bulk_item(item)
+                statuses.append(2)
+                if recipe is not None:
+                    pending.append((len(statuses) - 1, recipe))
+                if len(pending) >= BULK_CHUNK_SIZE:
+                    pending = write_recipe_chunk(conn, cursor, user_id, pending, statuses)
+            while pending:
+                pending = write_recipe_chunk(conn, cursor, user_id, pending, statuses)
+        except Exception as e:
+            # Earlier chunks are committed: report them, and every item read
+            # but not written (the failed chunk is rolled back) as 2
+            conn.close()
+            return jsonify({"status": 2, "data": statuses})
+        
+        conn.close()
+        return jsonify({"status": 1, "data": statuses})
+        
+    except Exception as e:
+        if conn:
+            conn.close()
+        return jsonify({"status": 2, "data": "NULL"})
+
 @app.route('/like', methods=['POST'])
 def like():
     """Like a recipe"""
@@ -394,12 +1297,13 @@ def like():
             return jsonify({"status": 2})
         
         # Verify JWT
-        username = verify_jwt(jwt_token)
-        if not username:
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
             return jsonify({"status": 2})
         
         # Get recipe_id from form
-        recipe_id = get_post_param('recipe_id')
+        params = get_params()
+        recipe_id = params.get('recipe_id')
         if not recipe_id:
             return jsonify({"status": 2})
         
@@ -411,42 +1315,109 @@ def like():
         conn = get_db()
         cursor = conn.cursor()
         
-        # Get user ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        if not user_data:
+        # Get user ID (a deleted account fails the foreign key on insert)
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
             conn.close()
             return jsonify({"status": 2})
         
-        user_id = user_data[0]
-        
-        # Check if recipe exists
-        cursor.execute("SELECT recipe_id FROM recipes WHERE recipe_id = ?", (recipe_id,))
-        if not cursor.fetchone():
+        # Like the recipe; a missing recipe fails the foreign key and a
+        # repeated like is ignored by UNIQUE (user_id, recipe_id)
+        cursor.execute("INSERT OR IGNORE INTO likes (user_id, recipe_id) VALUES (?, ?)", (user_id, recipe_id))
+        if cursor.rowcount == 0:
+            # Already liked, return error
             conn.close()
             return jsonify({"status": 2})
         
-        # Check if user already liked this recipe
-        cursor.execute("SELECT id FROM likes WHERE user_id = ? AND recipe_id = ?", (user_id, recipe_id))
-        existing_like = cursor.fetchone()
+        def apply():
+            popular_board.adjust(recipe_id, 1)
+            recipe_versions.invalidate([recipe_id])
+        commit_derived(conn, apply, ("likes",))
+        conn.close()
         
-        if existing_like:
-            # Already liked, return error
+        return jsonify({"status": 1})
+        
+    except Exception as e:
+        if conn:
             conn.close()
-            return jsonify({"status": 2})
+        return jsonify({"status": 2})
+
+@app.route('/like_batch', methods=['POST'])
+def like_batch():
+    """Like many recipes in one transaction"""
+    conn = None
+    try:
+        # Get JWT from Authorization header
+        jwt_token = get_jwt_from_header()
+        if not jwt_token:
+            return jsonify({"status": 2, "data": "NULL"})
         
-        # Like the recipe
-        cursor.execute("INSERT INTO likes (user_id, recipe_id) VALUES (?, ?)", (user_id, recipe_id))
+        # Verify JWT
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
+            return jsonify({"status": 2, "data": "NULL"})
         
-        conn.commit()
+        recipe_ids = get_list_param(get_params(), 'recipe_ids')
+        if recipe_ids is None:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        # Same per-item checks as /like: an integer, or text int() accepts
+        # (so 0 and "0" are ids); booleans, floats and the rest are rejected
+        wanted = []
+        for recipe_id in recipe_ids:
+            if type(recipe_id) is str and recipe_id:
+                try:
+                    recipe_id = int(recipe_id)
+                except:
+                    recipe_id = None
+            elif type(recipe_id) is not int:
+                recipe_id = None
+            if recipe_id is not None and not -2**63 <= recipe_id < 2**63:
+                recipe_id = None
+            wanted.append(recipe_id)
+        
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
+            conn.close()
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        # Likes of missing recipes are skipped; the UNIQUE(user_id, recipe_id)
+        # constraint drops existing likes and repeats within the batch
+        cursor.execute("""
+            INSERT OR IGNORE INTO likes (user_id, recipe_id)
+            SELECT ?, j.value
+            FROM json_each(?) j
+            WHERE j.value IN (SELECT recipe_id FROM recipes)
+            ORDER BY j.key
+            RETURNING recipe_id
+        """, (user_id, json.dumps([r for r in wanted if r is not None])))
+        liked = [row[0] for row in cursor.fetchall()]
+        
+        def apply():
+            for recipe_id in liked:
+                popular_board.adjust(recipe_id, 1)
+            recipe_versions.invalidate(liked)
+        commit_derived(conn, apply, ("likes",) if liked else ())
         conn.close()
         
-        return jsonify({"status": 1})
+        # Only the first occurrence of a newly liked recipe succeeded
+        new = set(liked)
+        statuses = []
+        for recipe_id in wanted:
+            if recipe_id in new:
+                new.discard(recipe_id)
+                statuses.append(1)
+            else:
+                statuses.append(2)
+        return jsonify({"status": 1, "data": statuses})
         
     except Exception as e:
         if conn:
             conn.close()
-        return jsonify({"status": 2})
+        return jsonify({"status": 2, "data": "NULL"})
 
 @app.route('/view_recipe/<int:recipe_id>', methods=['GET'])
 def view_recipe(recipe_id):
@@ -472,15 +1443,28 @@ def view_recipe(recipe_id):
         # If no attributes requested, return empty data with status 1
         if not any([want_name, want_description, want_likes, want_ingredients]):
             return jsonify({"status": 1, "data": {}})
+        mask = want_name | want_description << 1 | want_likes << 2 | want_ingredients << 3
         
         conn = get_db()
         cursor = conn.cursor()
         
-        # Get recipe data
+        # Answer a revalidation from the version cache when nothing changed;
+        # the shared counters first drop it if another process wrote since
+        if_none_match = request.if_none_match
+        if if_none_match and RECIPE_VERSION_CACHE_SIZE > 0:
+            refresh_derived(cursor)
+            version = recipe_versions.get(recipe_id)
+            if version is not None and if_none_match.contains_weak(recipe_etag(recipe_id, version, mask)):
+                conn.close()
+                return not_modified(recipe_etag(recipe_id, version, mask))
+        stamp = recipe_versions.stamp(recipe_id)
+        
+        # Get recipe data (like_count is maintained by triggers on likes)
         cursor.execute("""
-            SELECT name, description
-            FROM recipes
-            WHERE recipe_id = ?
+            SELECT r.name, r.description, r.like_count, ri.seq
+            FROM recipes r
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+            WHERE r.recipe_id = ?
         """, (recipe_id,))
         
         recipe_data = cursor.fetchone()
@@ -488,11 +1472,16 @@ def view_recipe(recipe_id):
             conn.close()
             return jsonify({"status": 2, "data": "NULL"})
         
-        name, description = recipe_data
+        name, description, like_count, seq = recipe_data
         
-        # Get like count
-        cursor.execute("SELECT COUNT(*) FROM likes WHERE recipe_id = ?", (recipe_id,))
-        like_count = cursor.fetchone()[0]
+        etag = None
+        if seq is not None:
+            version = (seq, like_count)
+            recipe_versions.fill(recipe_id, version, stamp)
+            etag = recipe_etag(recipe_id, version, mask)
+            if if_none_match.contains_weak(etag):
+                conn.close()
+                return not_modified(etag)
         
         # Get ingredients if requested
         ingredients_list = []
@@ -513,7 +1502,10 @@ def view_recipe(recipe_id):
         if want_ingredients:
             data['ingredients'] = ingredients_list
         
-        return jsonify({"status": 1, "data": data})
+        response = jsonify({"status": 1, "data": data})
+        if etag is not None:
+            mark_revalidatable(response, etag)
+        return response
         
     except Exception as e:
         if conn:
@@ -531,29 +1523,32 @@ def follow():
             return jsonify({"status": 2})
         
         # Verify JWT
-        username = verify_jwt(jwt_token)
-        if not username:
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
             return jsonify({"status": 2})
         
         # Get username to follow from form
-        follow_username = get_post_param('username')
+        params = get_params()
+        follow_username = params.get('username')
         if not follow_username:
             return jsonify({"status": 2})
         
         conn = get_db()
         cursor = conn.cursor()
         
-        # Get follower user ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        follower_data = cursor.fetchone()
-        if not follower_data:
+        # Get follower user ID (a deleted account fails the foreign key on insert)
+        follower_id = resolve_user_id(cursor, claims)
+        if follower_id is None:
             conn.close()
             return jsonify({"status": 2})
         
-        follower_id = follower_data[0]
-        
-        # Get user to follow ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (follow_username,))
+        # Follow by username in one statement: an unknown user or yourself
+        # selects no row and an existing follow is ignored by the UNIQUE
+        cursor.execute("""
+            INSERT OR IGNORE INTO follows (follower_id, following_id)
+            SELECT ?, id FROM users WHERE username = ? AND id != ?
+            RETURNING following_id
+        """, (follower_id, follow_username, follower_id))
         following_data = cursor.fetchone()
         if not following_data:
             conn.close()
@@ -561,19 +1556,8 @@ def follow():
         
         following_id = following_data[0]
         
-        # Cannot follow yourself
-        if follower_id == following_id:
-            conn.close()
-            return jsonify({"status": 2})
-        
-        # Check if already following
-        cursor.execute("SELECT id FROM follows WHERE follower_id = ? AND following_id = ?", (follower_id, following_id))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({"status": 2})
-        
-        # Insert follow relationship
-        cursor.execute("INSERT INTO follows (follower_id, following_id) VALUES (?, ?)", (follower_id, following_id))
+        # Backfill the follower's timeline with the author's latest recipes
+        timelines.backfill(cursor, follower_id, following_id, FEED_TIMELINE_LENGTH)
         
         conn.commit()
         conn.close()
@@ -585,9 +1569,9 @@ def follow():
             conn.close()
         return jsonify({"status": 2})
 
-@app.route('/search', methods=['GET'])
-def search():
-    """Search recipes by feed, popular, or ingredients"""
+@app.route('/follow_batch', methods=['POST'])
+def follow_batch():
+    """Follow many users in one transaction"""
     conn = None
     try:
         # Get JWT from Authorization header
@@ -596,54 +1580,153 @@ def search():
             return jsonify({"status": 2, "data": "NULL"})
         
         # Verify JWT
-        username = verify_jwt(jwt_token)
-        if not username:
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        usernames = get_list_param(get_params(), 'usernames')
+        if usernames is None:
             return jsonify({"status": 2, "data": "NULL"})
         
         conn = get_db()
         cursor = conn.cursor()
         
-        # Get user ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        if not user_data:
+        follower_id = resolve_user_id(cursor, claims)
+        if follower_id is None:
             conn.close()
             return jsonify({"status": 2, "data": "NULL"})
         
-        user_id = user_data[0]
+        # Resolve every target in one query
+        names = [name for name in usernames if name and isinstance(name, str)]
+        cursor.execute("""
+            SELECT username, id FROM users
+            WHERE username IN (SELECT value FROM json_each(?))
+        """, (json.dumps(names),))
+        ids = dict(cursor.fetchall())
+        
+        # Self-follows are skipped; the UNIQUE(follower_id, following_id)
+        # constraint drops existing follows and repeats within the batch
+        targets = [ids[name] for name in names if name in ids and ids[name] != follower_id]
+        cursor.execute("""
+            INSERT OR IGNORE INTO follows (follower_id, following_id)
+            SELECT ?, value FROM json_each(?) ORDER BY key
+            RETURNING following_id
+        """, (follower_id, json.dumps(targets)))
+        followed = [row[0] for row in cursor.fetchall()]
+        
+        # Backfill the follower's timeline with each new author's latest recipes
+        for following_id in followed:
+            timelines.backfill(cursor, follower_id, following_id, FEED_TIMELINE_LENGTH)
+        
+        conn.commit()
+        conn.close()
+        
+        # Only the first occurrence of a newly followed user succeeded
+        new = set(followed)
+        statuses = []
+        for name in usernames:
+            following_id = ids.get(name) if isinstance(name, str) else None
+            if following_id in new:
+                new.discard(following_id)
+                statuses.append(1)
+            else:
+                statuses.append(2)
+        return jsonify({"status": 1, "data": statuses})
+        
+    except Exception as e:
+        if conn:
+            conn.close()
+        return jsonify({"status": 2, "data": "NULL"})
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Search recipes by feed, popular, or ingredients"""
+    conn = None
+    try:
+        # Get JWT from Authorization header
+        jwt_token = get_jwt_from_header()
+        if not jwt_token:
+            return jsonify({"status": 2, "data": "NULL"})
+        
+        # Verify JWT
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
+            return jsonify({"status": 2, "data": "NULL"})
         
         # Check which search type
         feed = request.args.get('feed') == 'True'
         popular = request.args.get('popular') == 'True'
         ingredients_param = request.args.get('ingredients')
+        mode = 'feed' if feed else 'popular' if popular else 'ingredients' if ingredients_param else None
+        
+        # Keyset pagination: `limit` plus the `cursor` a previous page
+        # returned as next_cursor.  Without either, responses are unchanged.
+        paginate = 'limit' in request.args or 'cursor' in request.args
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+            token = request.args.get('cursor')
+            position = decode_search_cursor(token, mode) if token and mode else None
+        except ValueError:
+            return jsonify({"status": 2, "data": "NULL"})
+        next_key = None
+        
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        # Get user ID; reads have no foreign key to catch a deleted account,
+        # but /delete invalidates the username cache
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
+            conn.close()
+            return jsonify({"status": 2, "data": "NULL"})
         
         recipes = []
         
         if feed:
-            # Return 2 most recent recipes from users that the requesting user follows
-            cursor.execute("""
-                SELECT r.recipe_id, r.name, r.description, r.created_at
-                FROM recipes r
-                JOIN follows f ON r.user_id = f.following_id
-                LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
-                WHERE f.follower_id = ?
-                ORDER BY r.created_at DESC, ri.seq DESC
-                LIMIT 2
-            """, (user_id,))
-            recipes = cursor.fetchall()
+            # Most recent recipes (2 by default) from users that the requesting user follows;
+            # one extra row tells whether another page follows
+            k = limit or 2
+            rows = timelines.page(cursor, user_id, k + 1 if paginate else k, position, FEED_TIMELINE_LENGTH)
+            if len(rows) > k:
+                next_key = rows[k - 1][1:]
+            recipes = fetch_recipes_by_id(cursor, [row[0] for row in rows[:k]])
             
         elif popular:
-            # Return top 2 recipes by like count
-            cursor.execute("""
-                SELECT r.recipe_id, r.name, r.description, r.created_at
-                FROM recipes r
-                LEFT JOIN likes l ON r.recipe_id = l.recipe_id
-                LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
-                GROUP BY r.recipe_id
-                ORDER BY COUNT(l.id) DESC, r.created_at DESC, ri.seq DESC
-                LIMIT 2
-            """)
-            recipes = cursor.fetchall()
+            # Top recipes (2 by default) by like count
+            k = limit or 2
+            fetch = k + 1 if paginate else k
+            if LEADERBOARD_ENABLED:
+                # Under the lock, so no other reader's refresh empties the
+                # board between building and reading it
+                with derived_lock:
+                    refresh_derived(cursor)
+                    popular_board.ensure_built(cursor)
+                    keys = popular_board.page(fetch, position)
+                if len(keys) > k:
+                    next_key = keys[k - 1][:3]
+                recipes = fetch_recipes_by_id(cursor, [key[3] for key in keys[:k]])
+            else:
+                if position is None:
+                    cursor.execute("""
+                        SELECT r.recipe_id, r.name, r.description, r.like_count, r.created_at, ri.seq
+                        FROM recipes r
+                        LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+                        ORDER BY r.like_count DESC, r.created_at DESC, ri.seq DESC
+                        LIMIT ?
+                    """, (fetch,))
+                else:
+                    cursor.execute("""
+                        SELECT r.recipe_id, r.name, r.description, r.like_count, r.created_at, ri.seq
+                        FROM recipes r
+                        LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+                        WHERE (r.like_count, r.created_at, ri.seq) < (?, ?, ?)
+                        ORDER BY r.like_count DESC, r.created_at DESC, ri.seq DESC
+                        LIMIT ?
+                    """, position + (fetch,))
+                recipes = cursor.fetchall()
+                if len(recipes) > k:
+                    next_key = recipes[k - 1][3:]
+                    recipes = recipes[:k]
             
         elif ingredients_param:
             # Parse ingredients list
@@ -660,43 +1743,62 @@ def search():
             # because a valid recipe must contain at least one ingredient.
             if len(ingredients_list) == 0:
                 conn.close()
+                if paginate:
+                    return jsonify({"status": 1, "data": {}, "next_cursor": None})
                 return jsonify({"status": 1, "data": {}})
 
             # Get all recipes that only contain ingredients in the provided list
-            # Find recipes where ALL ingredients are in the provided list
-            placeholders = ','.join(['?'] * len(ingredients_list))
-            cursor.execute(f"""
-                SELECT DISTINCT r.recipe_id, r.name, r.description
-                FROM recipes r
-                WHERE NOT EXISTS (
-                    SELECT 1 FROM recipe_ingredients ri
-                    WHERE ri.recipe_id = r.recipe_id
-                    AND ri.ingredient NOT IN ({placeholders})
-                )
-                AND EXISTS (
-                    SELECT 1 FROM recipe_ingredients ri
-                    WHERE ri.recipe_id = r.recipe_id
-                )
-            """, ingredients_list)
-            recipes = cursor.fetchall()
+            # Find recipes where ALL ingredients are in the provided list,
+            # in recipe_id order (every match unless a limit is given)
+            after = position[0] if position else None
+            if INGREDIENT_INDEX_ENABLED:
+                with derived_lock:
+                    refresh_derived(cursor)
+                    ingredient_index.ensure_built(cursor)
+                    recipe_ids = ingredient_index.match(ingredients_list)
+                if after is not None:
+                    recipe_ids = recipe_ids[bisect.bisect_right(recipe_ids, after):]
+                if limit is not None and len(recipe_ids) > limit:
+                    next_key = (recipe_ids[limit - 1],)
+                    recipe_ids = recipe_ids[:limit]
+                recipes = fetch_recipes_by_id(cursor, recipe_ids)
+            else:
+                placeholders = ','.join(['?'] * len(ingredients_list))
+                cursor.execute(f"""
+                    SELECT DISTINCT r.recipe_id, r.name, r.description, r.like_count
+                    FROM recipes r
+                    WHERE (? IS NULL OR r.recipe_id > ?)
+                    AND NOT EXISTS (
+                        SELECT 1 FROM recipe_ingredients ri
+                        WHERE ri.recipe_id = r.recipe_id
+                        AND ri.ingredient NOT IN ({placeholders})
+                    )
+                    AND EXISTS (
+                        SELECT 1 FROM recipe_ingredients ri
+                        WHERE ri.recipe_id = r.recipe_id
+                    )
+                    ORDER BY r.recipe_id
+                    LIMIT ?
+                """, [after, after] + ingredients_list + [limit + 1 if limit else -1])
+                recipes = cursor.fetchall()
+                if limit is not None and len(recipes) > limit:
+                    next_key = (recipes[limit - 1][0],)
+                    recipes = recipes[:limit]
         else:
             conn.close()
             return jsonify({"status": 2, "data": "NULL"})
         
+        # Get ingredients for the whole result set in batched queries
+        ingredients_by_recipe = fetch_ingredients(cursor, [recipe[0] for recipe in recipes])
+        
         # Format results
         result_data = {}
         for recipe in recipes:
             recipe_id = recipe[0]
             name = recipe[1]
             description = recipe[2]
-            
-            # Get like count
-            cursor.execute("SELECT COUNT(*) FROM likes WHERE recipe_id = ?", (recipe_id,))
-            like_count = cursor.fetchone()[0]
-            
-            # Get ingredients from recipe_ingredients table
-            cursor.execute("SELECT ingredient FROM recipe_ingredients WHERE recipe_id = ? ORDER BY ingredient", (recipe_id,))
-            ingredients_list = [row[0] for row in cursor.fetchall()]
+            like_count = recipe[3]
+            ingredients_list = ingredients_by_recipe[recipe_id]
             
             result_data[str(recipe_id)] = {
                 "name": name,
@@ -709,6 +1811,9 @@ def search():
         
         # Spec says "we will assume there is always something to return"
         # But handle edge case gracefully - return status 1 with empty dict
+        if paginate:
+            return jsonify({"status": 1, "data": result_data,
+                            "next_cursor": encode_search_cursor(mode, next_key) if next_key else None})
         return jsonify({"status": 1, "data": result_data})
         
     except Exception as e:
@@ -727,16 +1832,18 @@ def delete():
             return jsonify({"status": 2})
         
         # Verify JWT
-        username = verify_jwt(jwt_token)
-        if not username:
+        claims = verify_jwt_claims(jwt_token)
+        if not claims:
             return jsonify({"status": 2})
         
         # Get username to delete from form
-        delete_username = get_post_param('username')
+        params = get_params()
+        delete_username = params.get('username')
         if not delete_username:
             return jsonify({"status": 2})
         
         # User can only delete their own account
+        username = claims['username']
         if username != delete_username:
             return jsonify({"status": 2})
         
@@ -744,20 +1851,47 @@ def delete():
         cursor = conn.cursor()
         
         # Get user ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        if not user_data:
+        user_id = resolve_user_id(cursor, claims)
+        if user_id is None:
             conn.close()
             return jsonify({"status": 2})
         
-        user_id = user_data[0]
+        # Note which in-memory index entries the cascades below will change
+        authored, liked = [], []
+        versions_cached = RECIPE_VERSION_CACHE_SIZE > 0
+        if LEADERBOARD_ENABLED or INGREDIENT_INDEX_ENABLED or versions_cached:
+            cursor.execute("SELECT recipe_id FROM recipes WHERE user_id = ?", (user_id,))
+            authored = [row[0] for row in cursor.fetchall()]
+        if LEADERBOARD_ENABLED or versions_cached:
+            cursor.execute("SELECT recipe_id FROM likes WHERE user_id = ?", (user_id,))
+            liked = [row[0] for row in cursor.fetchall()]
         
-        # Delete user (cascading deletes will handle recipes, likes, follows)
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        # Timelines that will lose this user's recipes and need refilling
+        feed_readers = timelines.readers_of_author(cursor, user_id)
         
-        conn.commit()
+        # Delete user (cascading deletes will handle recipes, likes, follows)
+        cursor.execute("DELETE FROM users WHERE id = ? AND username = ?", (user_id, username))
+        if cursor.rowcount != 1:
+            # Already deleted, or a stale cached id
+            conn.close()
+            user_id_cache.invalidate(username)
+            return jsonify({"status": 2})
+        timelines.refill(cursor, feed_readers, FEED_TIMELINE_LENGTH)
+        
+        def apply():
+            for recipe_id in liked:
+                popular_board.adjust(recipe_id, -1)
+            for recipe_id in authored:
+                popular_board.remove(recipe_id)
+                ingredient_index.remove(recipe_id)
+            recipe_versions.invalidate(liked + authored)
+        commit_derived(conn, apply, ("recipes", "likes", "users"))
         conn.close()
         
+        # Cached tokens and id of the deleted account must be looked up afresh
+        jwt_cache.invalidate_user(username)
+        user_id_cache.invalidate(username)
+        
         return jsonify({"status": 1})
         
     except Exception as e:
@@ -766,4 +1900,6 @@ def delete():
         return jsonify({"status": 2})
 
 if __name__ == '__main__':
+    print(f"SQLite storage profile: {DB_PROFILE_NAME} {DB_PROFILE}")
+    start_serving()
     app.run(debug=False)
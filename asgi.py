@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+ASGI serving mode for Project 2 - The Meals LAN
+
+Requests are accepted on an asyncio event loop and the Flask app runs on a
+bounded thread pool, so a slow SQLite write or a large search response
+only occupies a pool thread while the loop keeps accepting and answering
+other requests.  A request that exceeds ASGI_REQUEST_TIMEOUT, or whose
+client disconnects, is cancelled: if it is still queued it never runs,
+otherwise its running SQLite statement is interrupted.
+
+Usage: python asgi.py              (needs uvicorn)
+       uvicorn asgi:application --port 5000
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from db_pool import InterruptScope
+from app import app, start_serving, stop_serving, INTERRUPT_SCOPE_KEY, DB_POOL_SIZE, BULK_MAX_BODY_BYTES
+
+# Threads running the Flask app; more than the connection pool would only
+# queue on it
+ASGI_WORKERS = int(os.environ.get('ASGI_WORKERS', str(DB_POOL_SIZE)))
+# Seconds from receiving a request (body included) to answering it
+ASGI_REQUEST_TIMEOUT = float(os.environ.get('ASGI_REQUEST_TIMEOUT', '30'))
+ASGI_HOST = os.environ.get('ASGI_HOST', '127.0.0.1')
+ASGI_PORT = int(os.environ.get('ASGI_PORT', '5000'))
+
+# Bodies are buffered before the app sees them, so refuse anything larger
+# than the largest body an endpoint accepts
+MAX_BUFFERED_BODY = max(app.config['MAX_CONTENT_LENGTH'] or 0, BULK_MAX_BODY_BYTES)
+
+executor = ThreadPoolExecutor(max_workers=ASGI_WORKERS, thread_name_prefix='meals-worker')
+
+
+def build_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def run_wsgi(environ):
+    """Call the Flask app in a worker thread; returns (status, headers, body)"""
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return chunks.append
+
+    result = app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+class BodyTooLarge(Exception):
+    """The request body is larger than any endpoint accepts"""
+
+
+async def read_body(receive):
+    """Buffer the request body; returns None if the client went away"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BUFFERED_BODY:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def send_response(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_error(send, status):
+    body = b'{"status":2}\n'
+    await send_response(send, status, [('Content-Type', 'application/json'),
+                                       ('Content-Length', str(len(body)))], body)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Runs on the server's main thread, whichever way it was started
+            start_serving()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False, cancel_futures=True)
+            # uvicorn re-raises SIGTERM after shutting down, so atexit never runs
+            stop_serving()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ASGI_REQUEST_TIMEOUT
+    try:
+        body = await asyncio.wait_for(read_body(receive), ASGI_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        await send_error(send, 408)
+        return
+    except BodyTooLarge:
+        await send_error(send, 413)
+        return
+    if body is None:
+        return
+
+    environ = build_environ(scope, body)
+    interrupt = InterruptScope()
+    environ[INTERRUPT_SCOPE_KEY] = interrupt
+
+    work = loop.run_in_executor(executor, run_wsgi, environ)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    done, _ = await asyncio.wait({work, disconnect}, timeout=max(deadline - loop.time(), 0),
+                                 return_when=asyncio.FIRST_COMPLETED)
+    disconnect.cancel()
+    if work in done:
+        try:
+            status, headers, payload = work.result()
+        except Exception:
+            await send_error(send, 500)
+            return
+        await send_response(send, status, headers, payload)
+        return
+
+    # Timed out or abandoned: drop it from the queue or stop its SQL
+    work.cancel()
+    interrupt.cancel()
+    if disconnect not in done:
+        await send_error(send, 504)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The ASGI mode needs uvicorn: pip install uvicorn")
+    uvicorn.run(application, host=ASGI_HOST, port=ASGI_PORT, lifespan='on')
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Load test and latency benchmark for Project 2 - The Meals LAN
+
+Replays the requests the project-2 scenario scripts make (sign-up, login,
+recipes, likes, follows, feed/popular/ingredient searches, recipe views)
+as weighted workload mixes, from N concurrent clients, either in-process
+through Flask's test client or against a running server.  Per endpoint it
+reports throughput and p50/p95/p99 latency, and it writes everything as
+JSON so runs can be compared.
+
+Like the scenario scripts it starts with /clear, so point it at a
+scratch database.
+
+Usage: python benchmark.py --mix feed --clients 8 --duration 20 --output feed.json
+       python benchmark.py --mix like-storm --url http://127.0.0.1:5000
+       python benchmark.py --mix feed --compare feed.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from itertools import accumulate
+
+# Operation -> relative weight.  Each operation is one request.
+MIXES = {
+    # Logged-in users reading their feeds and opening recipes
+    "feed": {"search_feed": 60, "view_recipe": 25, "search_popular": 10, "like": 4, "create_recipe": 1},
+    # Many users liking a few hot recipes while others watch the ranking
+    "like-storm": {"like": 70, "search_popular": 20, "view_recipe": 10},
+    # Pantry searches over a long-tailed ingredient vocabulary
+    "ingredients": {"search_ingredients": 80, "view_recipe": 15, "create_recipe": 5},
+    # Account traffic (password hashing, token issue)
+    "accounts": {"login": 60, "create_user": 30, "follow": 10},
+    # A bit of everything
+    "mixed": {"search_feed": 25, "search_popular": 10, "search_ingredients": 15, "view_recipe": 20,
+              "like": 12, "follow": 5, "create_recipe": 8, "login": 4, "create_user": 1},
+}
+
+PASSWORD = "Qx7Yt9Lp"
+
+
+class InProcessClient:
+    """Requests through Flask's test client (one per thread)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path, params=None, headers=None):
+        response = self.client.get(path, query_string=params, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+    def post(self, path, data=None, json_body=None, headers=None):
+        response = self.client.post(path, data=data, json=json_body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Requests to a running server over keep-alive HTTP (one session per thread)"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def _result(self, response):
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+    def get(self, path, params=None, headers=None):
+        return self._result(self.session.get(self.base + path, params=params, headers=headers))
+
+    def post(self, path, data=None, json_body=None, headers=None):
+        return self._result(self.session.post(self.base + path, data=data, json=json_body, headers=headers))
+
+
+def zipf_cum_weights(n, s=1.1):
+    """Cumulative weights for ranks 1..n of a Zipf distribution.
+
+    Passed as random.choices(cum_weights=...), which otherwise sums the
+    weights again on every call.
+    """
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+class Dataset:
+    """Users, tokens and recipes created during setup, shared by all clients"""
+
+    def __init__(self, rng, users, recipes, vocabulary, follows, likes):
+        self.rng = rng
+        self.user_count = users
+        self.recipe_count = recipes
+        self.vocabulary = [f"ingredient{i}" for i in range(vocabulary)]
+        self.vocabulary_cum_weights = zipf_cum_weights(vocabulary)
+        self.follows_per_user = follows
+        self.likes = likes
+        self.usernames = []
+        self.tokens = []
+        self.recipe_ids = []
+        self.recipe_cum_weights = []
+        self.author_cum_weights = zipf_cum_weights(users)
+        self._lock = threading.Lock()
+        self._next_recipe_id = 1
+        self._next_user = 0
+
+    def new_recipe_id(self):
+        with self._lock:
+            recipe_id = self._next_recipe_id
+            self._next_recipe_id += 1
+            return recipe_id
+
+    def new_username(self, prefix):
+        with self._lock:
+            self._next_user += 1
+            return f"{prefix}{self._next_user}"
+
+    def ingredients(self, rng, count):
+        return list(dict.fromkeys(rng.choices(self.vocabulary, cum_weights=self.vocabulary_cum_weights, k=count)))
+
+    def any_token(self, rng):
+        return self.tokens[rng.randrange(len(self.tokens))]
+
+    def hot_recipe(self, rng):
+        return rng.choices(self.recipe_ids, cum_weights=self.recipe_cum_weights)[0]
+
+    def setup(self, client):
+        """/clear, then create users, recipes, follows and likes through the bulk endpoints"""
+        status, _ = client.get('/clear')
+        if status != 200:
+            raise RuntimeError(f"/clear answered HTTP {status}")
+        for _ in range(self.user_count):
+            username = self.new_username("bench")
+            _, body = client.post('/create_user', data=user_form(username))
+            if not body or body.get('status') != 1:
+                raise RuntimeError(f"could not create {username}: {body}")
+            _, body = client.post('/login', data={'username': username, 'password': PASSWORD})
+            self.usernames.append(username)
+            self.tokens.append({'Authorization': body['jwt']})
+
+        # Recipes: a few prolific (celebrity) authors, a long tail of others
+        by_author = defaultdict(list)
+        for _ in range(self.recipe_count):
+            author = self.rng.choices(range(self.user_count), cum_weights=self.author_cum_weights)[0]
+            recipe_id = self.new_recipe_id()
+            by_author[author].append({
+                'recipe_id': recipe_id, 'name': f"Recipe {recipe_id}", 'description': 'benchmark',
+                'ingredients': self.ingredients(self.rng, self.rng.randint(2, 8)),
+            })
+            self.recipe_ids.append(recipe_id)
+        for author, recipes in by_author.items():
+            _, body = client.post('/create_recipes', json_body=recipes, headers=self.tokens[author])
+            if not body or body.get('status') != 1:
+                raise RuntimeError(f"bulk create failed: {body}")
+        self.recipe_cum_weights = zipf_cum_weights(len(self.recipe_ids))
+
+        # Follows skewed towards the celebrity authors
+        for follower in range(self.user_count):
+            targets = set(self.rng.choices(range(self.user_count), cum_weights=self.author_cum_weights, k=self.follows_per_user))
+            targets.discard(follower)
+            if targets:
+                client.post('/follow_batch', json_body={'usernames': [self.usernames[t] for t in targets]},
+                            headers=self.tokens[follower])
+
+        # Likes concentrated on the hot recipes
+        per_user = max(1, self.likes // max(1, self.user_count))
+        for liker in range(self.user_count):
+            picks = set(self.rng.choices(self.recipe_ids, cum_weights=self.recipe_cum_weights, k=per_user))
+            client.post('/like_batch', json_body={'recipe_ids': sorted(picks)}, headers=self.tokens[liker])
+
+
+def user_form(username):
+    return {'first_name': 'Bench', 'last_name': 'Mark', 'username': username,
+            'email_address': f"{username}@bench.example", 'password': PASSWORD, 'salt': 'bench'}
+
+
+# Each operation draws its parameters and returns (endpoint, method, path,
+# keyword arguments for the client); only the request itself is timed
+
+def op_search_feed(data, rng):
+    return '/search?feed', 'get', '/search', {'params': {'feed': 'True'}, 'headers': data.any_token(rng)}
+
+
+def op_search_popular(data, rng):
+    return '/search?popular', 'get', '/search', {'params': {'popular': 'True'}, 'headers': data.any_token(rng)}
+
+
+def op_search_ingredients(data, rng):
+    pantry = data.ingredients(rng, rng.randint(5, 40))
+    return '/search?ingredients', 'get', '/search', {'params': {'ingredients': json.dumps(pantry)},
+                                                     'headers': data.any_token(rng)}
+
+
+def op_view_recipe(data, rng):
+    params = {'name': 'True', 'description': 'True', 'likes': 'True', 'ingredients': 'True'}
+    return '/view_recipe', 'get', f"/view_recipe/{data.hot_recipe(rng)}", {'params': params,
+                                                                           'headers': data.any_token(rng)}
+
+
+def op_like(data, rng):
+    return '/like', 'post', '/like', {'data': {'recipe_id': data.hot_recipe(rng)}, 'headers': data.any_token(rng)}
+
+
+def op_follow(data, rng):
+    target = rng.choices(data.usernames, cum_weights=data.author_cum_weights)[0]
+    return '/follow', 'post', '/follow', {'data': {'username': target}, 'headers': data.any_token(rng)}
+
+
+def op_create_recipe(data, rng):
+    recipe_id = data.new_recipe_id()
+    form = {'name': f"Recipe {recipe_id}", 'description': 'benchmark', 'recipe_id': recipe_id,
+            'ingredients': json.dumps(data.ingredients(rng, rng.randint(2, 8)))}
+    return '/create_recipe', 'post', '/create_recipe', {'data': form, 'headers': data.any_token(rng)}
+
+
+def op_login(data, rng):
+    username = data.usernames[rng.randrange(len(data.usernames))]
+    return '/login', 'post', '/login', {'data': {'username': username, 'password': PASSWORD}}
+
+
+def op_create_user(data, rng):
+    return '/create_user', 'post', '/create_user', {'data': user_form(data.new_username("signup"))}
+
+
+OPERATIONS = {name[3:]: fn for name, fn in globals().items() if name.startswith('op_')}
+
+
+def percentiles(samples):
+    """Nearest-rank latency percentiles in milliseconds"""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def run_clients(make_client, data, mix, clients, duration, warmup, max_requests, seed):
+    """Drive the mix from `clients` threads; returns (per-endpoint samples, measured seconds)"""
+    operations = [OPERATIONS[name] for name in mix]
+    cum_weights = list(accumulate(mix.values()))
+    samples = defaultdict(lambda: {"latencies": [], "errors": 0, "refused": 0})
+    samples_lock = threading.Lock()
+    issued = [0]
+    finished_at = [0.0]
+    start_at = time.perf_counter() + 0.1
+    measure_from = start_at + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        client = make_client()
+        rng = random.Random(seed * 1000 + index)
+        local = defaultdict(lambda: {"latencies": [], "errors": 0, "refused": 0})
+        while time.perf_counter() < start_at:
+            time.sleep(0.001)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            if max_requests and now >= measure_from:
+                with samples_lock:
+                    if issued[0] >= max_requests:
+                        break
+                    issued[0] += 1
+            operation = rng.choices(operations, cum_weights=cum_weights)[0]
+            endpoint, method, path, kwargs = operation(data, rng)
+            send = getattr(client, method)
+            started = time.perf_counter()
+            try:
+                http_status, body = send(path, **kwargs)
+            except Exception:
+                http_status, body = None, None
+            finished = time.perf_counter()
+            if started < measure_from:
+                continue
+            app_status = body.get('status') if isinstance(body, dict) else None
+            entry = local[endpoint]
+            entry["latencies"].append(finished - started)
+            if http_status is None or http_status >= 500:
+                entry["errors"] += 1
+            elif app_status != 1:
+                # Refused by the app (e.g. a repeated like): a valid answer, counted apart
+                entry["refused"] += 1
+        with samples_lock:
+            for endpoint, entry in local.items():
+                merged = samples[endpoint]
+                merged["latencies"].extend(entry["latencies"])
+                merged["errors"] += entry["errors"]
+                merged["refused"] += entry["refused"]
+            finished_at[0] = max(finished_at[0], time.perf_counter())
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    measured = max(min(finished_at[0], stop_at) - measure_from, 1e-9)
+    return samples, measured
+
+
+def summarize(samples, seconds):
+    endpoints = {}
+    all_latencies = []
+    totals = {"requests": 0, "errors": 0, "refused": 0}
+    for endpoint in sorted(samples):
+        entry = samples[endpoint]
+        count = len(entry["latencies"])
+        all_latencies.extend(entry["latencies"])
+        totals["requests"] += count
+        totals["errors"] += entry["errors"]
+        totals["refused"] += entry["refused"]
+        endpoints[endpoint] = dict({
+            "requests": count,
+            "errors": entry["errors"],
+            "refused": entry["refused"],
+            "throughput_rps": round(count / seconds, 2),
+        }, **percentiles(entry["latencies"]))
+    overall = dict(totals, throughput_rps=round(totals["requests"] / seconds, 2), **percentiles(all_latencies))
+    return {"seconds": round(seconds, 3), "overall": overall, "endpoints": endpoints}
+
+
+def print_table(result, baseline=None):
+    def row(name, stats, base):
+        line = (f"{name:<22}{stats['requests']:>9}{stats['throughput_rps']:>11.1f}"
+                f"{fmt(stats['p50_ms']):>10}{fmt(stats['p95_ms']):>10}{fmt(stats['p99_ms']):>10}"
+                f"{stats['errors']:>8}{stats['refused']:>9}")
+        if base:
+            line += f"   rps {delta(stats['throughput_rps'], base['throughput_rps'])}  p99 {delta(stats['p99_ms'], base['p99_ms'])}"
+        print(line)
+
+    print(f"{'endpoint':<22}{'requests':>9}{'req/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'refused':>9}")
+    base_endpoints = baseline["endpoints"] if baseline else {}
+    for endpoint, stats in result["endpoints"].items():
+        row(endpoint, stats, base_endpoints.get(endpoint))
+    row("overall", result["overall"], baseline["overall"] if baseline else None)
+
+
+def fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def delta(value, base):
+    if value is None or not base:
+        return "n/a"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Meals LAN API with weighted workload mixes")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--url', help="benchmark a running server instead of the in-process test client")
+    parser.add_argument('--clients', type=int, default=4, help="concurrent clients (threads)")
+    parser.add_argument('--duration', type=float, default=10.0, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds run before measuring")
+    parser.add_argument('--requests', type=int, default=0, help="stop after this many measured requests")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--vocabulary', type=int, default=500, help="distinct ingredients")
+    parser.add_argument('--follows', type=int, default=20, help="follows drawn per user")
+    parser.add_argument('--likes', type=int, default=5000, help="likes created during setup")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="print changes against an earlier JSON result")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+        target = args.url
+    else:
+        from app import app
+        def make_client():
+            return InProcessClient(app)
+        target = "in-process"
+
+    data = Dataset(random.Random(args.seed), args.users, args.recipes, args.vocabulary, args.follows, args.likes)
+    started = time.perf_counter()
+    data.setup(make_client())
+    setup_seconds = time.perf_counter() - started
+
+    mix = MIXES[args.mix]
+    samples, seconds = run_clients(make_client, data, mix, args.clients, args.duration,
+                                   args.warmup, args.requests, args.seed)
+    result = {
+        "mix": args.mix,
+        "weights": mix,
+        "target": target,
+        "clients": args.clients,
+        "seed": args.seed,
+        "dataset": {"users": args.users, "recipes": args.recipes, "vocabulary": args.vocabulary,
+                    "follows_per_user": args.follows, "likes": args.likes,
+                    "setup_seconds": round(setup_seconds, 3)},
+        # Settings the app reads from the environment, so runs can be told apart
+        "environment": {key: value for key, value in sorted(os.environ.items())
+                        if key.startswith(('DB_', 'STORAGE_', 'SNAPSHOT_', 'CLEAR_', 'JWT_', 'PASSWORD_',
+                                           'LEADERBOARD_', 'INGREDIENT_', 'RECIPE_', 'FEED_', 'ASGI_'))},
+        "python": platform.python_version(),
+        "started_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    result.update(summarize(samples, seconds))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(f"mix={args.mix} target={target} clients={args.clients} seconds={result['seconds']}")
+    print_table(result, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+        print(f"results written to {args.output}")
+    return 1 if result["overall"]["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
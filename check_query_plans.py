@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for Project 2 - The Meals LAN
+
+Collects every SQL statement passed to execute()/executemany() in the app
+sources, runs EXPLAIN QUERY PLAN for each against a fully migrated
+in-memory copy of the schema, and fails if any of them falls back to a
+full table scan.  It also fails if a foreign key has no index on its child
+column, because ON DELETE CASCADE would then scan the child table.
+
+Usage: python check_query_plans.py
+"""
+
+import ast
+import os
+import sqlite3
+import sys
+
+from migrations import migrate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCES = ["app.py", "leaderboard.py", "timelines.py", "ingredient_index.py", "data_versions.py"]
+SQL_FILE = os.path.join(HERE, "project2.sql")
+
+# (function, table alias) pairs whose full scan is intended, with the reason
+ALLOWED_SCANS = {
+    ("search", "r"): "popular ranking and ingredient matching visit every recipe",
+    ("rebuild", "r"): "the leaderboard is rebuilt from every recipe at startup",
+    ("rebuild", "f"): "timelines are rebuilt from every follow",
+    ("rebuild", "recipe_ingredients"): "the ingredient index is rebuilt from every row",
+    ("check", "recipe_ingredients"): "the consistency check compares every row",
+    ("rebuild", "users"): "every user's timeline length is recounted after a rebuild",
+}
+
+
+def _sql_text(node):
+    """Return the SQL of a str or f-string literal, with {...} parts as '?'"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            else:
+                parts.append("?")
+        return "".join(parts)
+    return None
+
+
+def collect_queries(path):
+    """Yield (function name, line number, sql) for every literal query in a file"""
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for node in ast.walk(func):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany") and node.args):
+                sql = _sql_text(node.args[0])
+                if sql is None:
+                    continue
+                keyword = sql.split(None, 1)[0].upper() if sql.strip() else ""
+                if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE"):
+                    yield func.name, node.lineno, sql
+
+
+def build_schema():
+    conn = sqlite3.connect(":memory:")
+    with open(SQL_FILE, 'r') as f:
+        conn.executescript(f.read())
+    migrate(conn)
+    return conn
+
+
+def full_scans(conn, sql):
+    """Return the table aliases that EXPLAIN QUERY PLAN reports as full scans"""
+    params = [None] * sql.count("?")
+    scans = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        detail = row[-1]
+        if not detail.startswith("SCAN ") or detail.startswith("SCAN CONSTANT ROW"):
+            continue
+        target = detail.split()[1]
+        # Scanning a materialised subquery's rows or a table-valued function
+        # such as json_each is not a table scan
+        if target.startswith("(") or "VIRTUAL TABLE" in detail:
+            continue
+        # "SCAN t USING INDEX i" still walks the whole index
+        scans.append(target)
+    return scans
+
+
+def unindexed_foreign_keys(conn):
+    """Return (table, column) pairs of foreign keys without a leading index"""
+    missing = []
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        leading = set()
+        for index in conn.execute(f"PRAGMA index_list('{table}')").fetchall():
+            columns = conn.execute(f"PRAGMA index_info('{index[1]}')").fetchall()
+            if columns:
+                leading.add(columns[0][2])
+        for pk in conn.execute(f"PRAGMA table_info('{table}')").fetchall():
+            if pk[5] == 1:
+                leading.add(pk[1])
+        for fk in conn.execute(f"PRAGMA foreign_key_list('{table}')").fetchall():
+            if fk[3] not in leading:
+                missing.append((table, fk[3]))
+    return missing
+
+
+def main():
+    conn = build_schema()
+    failures = 0
+    checked = 0
+    for source in SOURCES:
+        path = os.path.join(HERE, source)
+        for func, lineno, sql in collect_queries(path):
+            checked += 1
+            try:
+                scans = full_scans(conn, sql)
+            except sqlite3.Error as e:
+                print(f"ERROR {source}:{lineno} ({func}): {e}")
+                failures += 1
+                continue
+            for alias in scans:
+                if (func, alias) in ALLOWED_SCANS:
+                    continue
+                print(f"FULL SCAN {source}:{lineno} ({func}) on {alias}: {' '.join(sql.split())}")
+                failures += 1
+    for table, column in unindexed_foreign_keys(conn):
+        print(f"UNINDEXED FOREIGN KEY {table}.{column} (cascades will scan {table})")
+        failures += 1
+    conn.close()
+    print(f"{checked} queries checked, {failures} problem(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Cross-process change detection for Project 2 - The Meals LAN
+"""
+
+import secrets
+import threading
+
+# Kinds of change counted in the data_versions table (migrations 6 and 7),
+# in the column order of the statements below
+KINDS = ("recipes", "likes", "users")
+
+
+class DataVersions:
+    """Tells per-process caches that another process changed the database.
+
+    Every write transaction bumps the counters of the kinds of data it
+    changed (bump()), and the writer applies its own in-memory updates
+    after committing (advance()).  Readers call refresh() before trusting
+    a cache; if a counter moved by more than this process accounts for,
+    the caches that depend on that kind are invalidated and rebuilt from
+    the database by their next reader.  All of it runs under ``lock``, the
+    lock writers hold across their commit.
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self._dependents = {kind: [] for kind in KINDS}
+        # (generation, recipes, likes, users) last accounted for, None if unknown
+        self._seen = None
+        self.foreign_changes = 0
+
+    def depend(self, kinds, invalidate):
+        """Call invalidate() whenever another process changes any of kinds"""
+        for kind in kinds:
+            self._dependents[kind].append(invalidate)
+
+    def bump(self, cursor, kinds):
+        """Count a change inside the write transaction; returns the new counters"""
+        cursor.execute("""
+            UPDATE data_versions SET recipes = recipes + ?, likes = likes + ?, users = users + ?
+            WHERE id = 1
+            RETURNING generation, recipes, likes, users
+        """, tuple(int(kind in kinds) for kind in KINDS))
+        return cursor.fetchone()
+
+    def advance(self, counters, kinds):
+        """After committing a bump(): catch up, invalidating for anything done elsewhere"""
+        with self.lock:
+            seen = self._seen
+            if seen is not None and seen[0] == counters[0]:
+                seen = (seen[0],) + tuple(count + (kind in kinds) for kind, count in zip(KINDS, seen[1:]))
+            self._observe(counters, seen)
+
+    def refresh(self, cursor):
+        """Invalidate caches built before another process's changes; call before reading them"""
+        cursor.execute("SELECT generation, recipes, likes, users FROM data_versions WHERE id = 1")
+        counters = cursor.fetchone()
+        with self.lock:
+            seen = self._seen
+            if (seen is not None and seen[0] == counters[0]
+                    and all(count <= old for count, old in zip(counters[1:], seen[1:]))):
+                # Nothing newer than what this process already accounted for
+                return
+            self._observe(counters, seen)
+
+    def _observe(self, counters, expected):
+        if expected is None or expected[0] != counters[0]:
+            changed = KINDS
+        else:
+            changed = [kind for kind, count, old in zip(KINDS, counters[1:], expected[1:]) if count != old]
+        if changed:
+            if expected is not None:
+                self.foreign_changes += 1
+            invalidated = set()
+            for kind in changed:
+                for invalidate in self._dependents[kind]:
+                    if invalidate not in invalidated:
+                        invalidated.add(invalidate)
+                        invalidate()
+        self._seen = tuple(counters)
+
+    def reset(self):
+        """Forget the counters, e.g. after this process reset the database"""
+        with self.lock:
+            self._seen = None
+
+    def stats(self):
+        with self.lock:
+            return {"foreign_changes": self.foreign_changes}
+
+
+def new_generation(conn):
+    """Start the counters of a freshly built or reset database over under a new generation"""
+    conn.execute("UPDATE data_versions SET generation = ?, recipes = 0, likes = 0, users = 0 WHERE id = 1",
+                 (secrets.randbits(62),))
+    conn.commit()
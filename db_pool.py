@@ -0,0 +1,374 @@
+"""
+SQLite connection pool for Project 2 - The Meals LAN
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within the timeout"""
+
+
+class InterruptScope:
+    """Connections checked out on behalf of one request.
+
+    cancel() interrupts whatever statement those connections are running
+    (sqlite3 raises OperationalError "interrupted" in the worker thread),
+    and connections attached afterwards are refused, so a request that
+    timed out stops at its next database call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = []
+        self.cancelled = False
+
+    def attach(self, conn):
+        with self._lock:
+            if self.cancelled:
+                conn.close()
+                raise sqlite3.OperationalError("interrupted")
+            self._connections.append(conn)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.interrupt()
+
+
+class TracedCursor:
+    """sqlite3 cursor wrapper that reports every executed statement to a tracer.
+
+    SQLite produces most rows of a query while they are fetched, not in
+    execute(); if ``time_tracer`` is set, fetches are timed too and
+    reported as ``time_tracer(seconds)``.  If ``statement_tracer`` is set,
+    each statement is reported again once it is finished (its rows are
+    exhausted, or the cursor is reused, closed or dropped) as
+    ``statement_tracer(sql, params, seconds)``, with the time spent both
+    executing it and fetching its rows.
+    """
+
+    __slots__ = ('_cursor', '_tracer', '_time_tracer', '_statement_tracer', '_sql', '_params', '_seconds')
+
+    def __init__(self, cursor, tracer, time_tracer=None, statement_tracer=None):
+        self._cursor = cursor
+        self._tracer = tracer
+        self._time_tracer = time_tracer
+        self._statement_tracer = statement_tracer
+        self._sql = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, params)
+        finally:
+            self._traced(sql, params, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_params)
+        finally:
+            self._traced(sql, None, time.perf_counter() - started)
+        # executemany() leaves no rows to fetch
+        self._finish()
+        return self
+
+    def _traced(self, sql, params, seconds):
+        self._tracer(sql, params, seconds)
+        if self._statement_tracer is not None:
+            self._sql = sql
+            self._params = params
+            self._seconds = seconds
+
+    def _finish(self):
+        sql = self._sql
+        if sql is not None:
+            self._sql = None
+            self._statement_tracer(sql, self._params, self._seconds)
+
+    def _timed(self, fetch, *args):
+        if self._time_tracer is None and self._sql is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._spent(time.perf_counter() - started)
+
+    def _spent(self, seconds):
+        if self._time_tracer is not None:
+            self._time_tracer(seconds)
+        if self._sql is not None:
+            self._seconds += seconds
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._finish()
+        return rows
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self._cursor.arraysize
+        rows = self._timed(self._cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def __iter__(self):
+        if self._time_tracer is None and self._sql is None:
+            return iter(self._cursor)
+        return self._timed_rows()
+
+    def _timed_rows(self):
+        # Time spent producing rows, reported once the iteration ends
+        cursor = self._cursor
+        seconds = 0.0
+        exhausted = False
+        try:
+            while True:
+                started = time.perf_counter()
+                row = cursor.fetchone()
+                seconds += time.perf_counter() - started
+                if row is None:
+                    exhausted = True
+                    return
+                yield row
+        finally:
+            self._spent(seconds)
+            if exhausted:
+                self._finish()
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Thin proxy around a sqlite3 connection that returns it to the pool on close()"""
+
+    __slots__ = ('_pool', '_raw', '_generation')
+
+    def __init__(self, pool, raw, generation):
+        self._pool = pool
+        self._raw = raw
+        self._generation = generation
+
+    def cursor(self):
+        tracer = self._pool.tracer
+        if tracer is None:
+            return self._raw.cursor()
+        pool = self._pool
+        return TracedCursor(self._raw.cursor(), tracer, pool.time_tracer, pool.statement_tracer)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self):
+        time_tracer = self._pool.time_tracer
+        if time_tracer is None:
+            self._raw.commit()
+            return
+        started = time.perf_counter()
+        try:
+            self._raw.commit()
+        finally:
+            time_tracer(time.perf_counter() - started)
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def interrupt(self):
+        """Abort the statement running on this connection; no-op once closed.
+
+        SQLite ignores an interrupt when no statement is running, so a
+        connection handed back to the pool is not affected.
+        """
+        raw = self._raw
+        if raw is not None:
+            raw.interrupt()
+
+    def close(self):
+        """Hand the connection back to the pool (safe to call more than once)"""
+        raw = self._raw
+        if raw is None:
+            return
+        self._raw = None
+        self._pool._release(raw, self._generation)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived, pre-configured sqlite3 connections.
+
+    Connections are created lazily up to ``max_size`` and reused LIFO so the
+    most recently used (warmest) statement cache is handed out first.  The
+    pool is fork-aware: a worker process forked from a parent that already
+    opened connections starts with an empty pool of its own.
+
+    If ``tracer`` is set, cursors handed out by pooled connections call
+    ``tracer(sql, params, seconds)`` after every statement (and
+    ``time_tracer`` and ``statement_tracer`` as described on TracedCursor,
+    if those are set too; ``time_tracer`` also times commits); when it is
+    None callers get plain sqlite3 cursors and pay nothing.
+    """
+
+    def __init__(self, database, max_size=8, timeout=5.0, setup=None,
+                 cached_statements=256, uri=False, tracer=None, time_tracer=None,
+                 statement_tracer=None):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.setup = setup
+        self.cached_statements = cached_statements
+        self.uri = uri
+        self.tracer = tracer
+        self.time_tracer = time_tracer
+        self.statement_tracer = statement_tracer
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._open = 0
+        self._generation = 0
+        self._pid = os.getpid()
+        self._orphans = []
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def _connect(self):
+        raw = sqlite3.connect(self.database, check_same_thread=False,
+                              cached_statements=self.cached_statements, uri=self.uri)
+        try:
+            if self.setup is not None:
+                self.setup(raw)
+        except:
+            raw.close()
+            raise
+        return raw
+
+    def _check_pid(self):
+        # Called with the lock held.  Connections inherited across fork() must
+        # never be used (or closed) by the child, so just drop our references.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._orphans.extend(self._idle)
+            self._idle = []
+            self._open = 0
+            self._generation += 1
+            self._pid = pid
+
+    def acquire(self):
+        """Check out a connection, creating one if the pool is not yet full"""
+        with self._cond:
+            self._check_pid()
+            if self._idle:
+                self.hits += 1
+                return PooledConnection(self, self._idle.pop(), self._generation)
+            if self._open >= self.max_size:
+                self.waits += 1
+                started = time.perf_counter()
+                deadline = started + self.timeout
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        self.wait_seconds += time.perf_counter() - started
+                        raise PoolTimeout("no database connection available")
+                    self._cond.wait(remaining)
+                self.wait_seconds += time.perf_counter() - started
+                if self._idle:
+                    self.hits += 1
+                    return PooledConnection(self, self._idle.pop(), self._generation)
+            self.misses += 1
+            self._open += 1
+            generation = self._generation
+        try:
+            raw = self._connect()
+        except:
+            with self._cond:
+                if generation == self._generation:
+                    self._open -= 1
+                    self._cond.notify()
+            raise
+        return PooledConnection(self, raw, generation)
+
+    def _release(self, raw, generation):
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+        with self._cond:
+            if generation != self._generation or os.getpid() != self._pid:
+                stale = True
+            else:
+                stale = not healthy
+                if stale:
+                    self._open -= 1
+                else:
+                    self._idle.append(raw)
+                self._cond.notify()
+        if stale:
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+
+    def reset(self):
+        """Close every idle connection; checked-out ones are closed on release"""
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+            self._open = 0
+            self._generation += 1
+            self._cond.notify_all()
+        for raw in idle:
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Snapshot of the pool counters"""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_seconds": round(self.wait_seconds, 6),
+            }
@@ -0,0 +1,97 @@
+"""
+SQLite storage-tuning profiles for Project 2 - The Meals LAN
+"""
+
+import os
+
+# Named presets; every value is applied as a PRAGMA on each new connection.
+PROFILES = {
+    # Rollback-safe on power loss: WAL with a full fsync on every commit
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # WAL so writers do not block readers; NORMAL only fsyncs at checkpoints
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Throughput over durability; never use for data you want to keep
+    "benchmark": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+_INT_SETTINGS = ("cache_size", "mmap_size", "busy_timeout")
+
+
+def _validate(settings):
+    """Normalise and check settings; values end up inside PRAGMA statements"""
+    clean = {}
+    for key, choices in (("journal_mode", _JOURNAL_MODES),
+                         ("synchronous", _SYNCHRONOUS),
+                         ("temp_store", _TEMP_STORE)):
+        value = str(settings[key]).upper()
+        if value not in choices:
+            raise ValueError(f"invalid {key}: {settings[key]!r}")
+        clean[key] = value
+    for key in _INT_SETTINGS:
+        clean[key] = int(settings[key])
+    return clean
+
+
+def load_profile(name=None, environ=None):
+    """Resolve the active profile from DB_PROFILE plus per-setting overrides.
+
+    Any setting can be overridden individually with DB_<SETTING>, for
+    example DB_SYNCHRONOUS=FULL on top of the "balanced" preset.
+    """
+    environ = os.environ if environ is None else environ
+    name = name or environ.get('DB_PROFILE', DEFAULT_PROFILE)
+    if name not in PROFILES:
+        raise ValueError(f"unknown storage profile: {name!r}")
+    settings = dict(PROFILES[name])
+    for key in settings:
+        override = environ.get('DB_' + key.upper())
+        if override is not None:
+            settings[key] = override
+    return name, _validate(settings)
+
+
+def apply_profile(conn, settings):
+    """Apply the tuning PRAGMAs to a freshly opened connection"""
+    # busy_timeout first so switching journal_mode waits out other writers
+    conn.execute(f"PRAGMA busy_timeout = {settings['busy_timeout']}")
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {settings['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size = {settings['mmap_size']}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+
+
+def read_effective(conn):
+    """Read back what SQLite actually applied (e.g. WAL is refused for :memory:)"""
+    effective = {}
+    for key in ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout"):
+        row = conn.execute(f"PRAGMA {key}").fetchone()
+        # None when the setting does not apply (no mmap for an in-memory VFS)
+        effective[key] = row[0] if row else None
+    return effective
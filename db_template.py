@@ -0,0 +1,40 @@
+"""
+Schema template for Project 2 - The Meals LAN
+"""
+
+import sqlite3
+import threading
+
+from migrations import migrate
+
+
+class SchemaTemplate:
+    """An empty, fully migrated database built once in memory.
+
+    restore() copies it over another connection's database with the SQLite
+    backup API.  The destination file is rewritten in place rather than
+    unlinked, so every other open connection keeps pointing at a live file
+    and simply sees the empty schema on its next statement (the schema
+    cookie changes, so cached statements are re-prepared).
+    """
+
+    def __init__(self, sql_file):
+        self.sql_file = sql_file
+        self._lock = threading.Lock()
+        self._conn = None
+        self.restores = 0
+
+    def _build(self):
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        with open(self.sql_file, 'r') as sql_startup:
+            conn.executescript(sql_startup.read())
+        migrate(conn)
+        return conn
+
+    def restore(self, dest):
+        """Replace the whole contents of dest's main database with the template"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._build()
+            self._conn.backup(dest)
+            self.restores += 1
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for Project 2 - The Meals LAN
+
+Fills the project2.sql schema (migrated to the latest version) directly
+with skewed, realistic-looking data:
+
+- users, each able to log in with the password "Passw0rd!" (salted SHA-256
+  like /create_user); a few celebrity authors post a large share of the
+  recipes and collect a large share of the follows
+- recipes authored along a Zipf distribution, with created_at spread over
+  a fixed period in insert order
+- ingredients drawn from a vocabulary with a long tail (a few staples,
+  thousands of rare items)
+- likes concentrated on hot recipes and follows concentrated on popular
+  authors (both Zipf), without duplicates or self-follows
+- feed timelines rebuilt the way the app maintains them, with authors
+  above FEED_PULL_THRESHOLD followers flagged as pull authors
+
+Rows are written with executemany in large transactions.  Secondary
+indexes and the like-count triggers are dropped for the load and
+recreated afterwards (the counts are filled in one statement), so a
+ten-million-like dataset builds in minutes.  The same seed always
+produces the same database.
+
+Usage: python generate_dataset.py --users 1000000 --recipes 2000000 --likes 10000000 \\
+           --follows 20000000 --db project2.db --force
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from migrations import migrate, schema_lock
+
+PASSWORD = "Passw0rd!"
+
+STAPLES = ["salt", "pepper", "olive oil", "butter", "garlic", "onion", "sugar", "flour", "eggs",
+           "milk", "water", "lemon", "tomato", "rice", "chicken", "cheese", "parsley", "cumin",
+           "paprika", "carrot", "potato", "ginger", "soy sauce", "honey", "vinegar", "cream",
+           "basil", "oregano", "chili", "beef"]
+FIRST_NAMES = ["Ada", "Ben", "Cleo", "Dan", "Eve", "Finn", "Gia", "Hugo", "Ines", "Jon", "Kai",
+               "Lea", "Max", "Nia", "Oto", "Pia", "Quin", "Rosa", "Sam", "Tess"]
+LAST_NAMES = ["Baker", "Cook", "Fisher", "Gardner", "Hunter", "Miller", "Potter", "Salter",
+              "Shepherd", "Smith", "Taylor", "Weaver"]
+DISHES = ["Soup", "Stew", "Salad", "Pie", "Curry", "Bake", "Roast", "Tart", "Risotto", "Noodles",
+          "Skillet", "Casserole", "Bread", "Cake", "Sandwich", "Tacos"]
+
+
+class Zipf:
+    """Draws 0-based ranks from a Zipf(s) distribution over n items"""
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        total = 0.0
+        self.cumulative = []
+        for rank in range(1, n + 1):
+            total += 1.0 / (rank ** s)
+            self.cumulative.append(total)
+        self.total = total
+
+    def draw(self):
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.total)
+
+
+def batches(rows, size):
+    """Split an iterator into lists of at most size rows"""
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def suspend_indexes_and_triggers(conn, tables):
+    """Drop secondary indexes and triggers on tables; returns the SQL to recreate them"""
+    placeholders = ", ".join("?" for _ in tables)
+    rows = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables).fetchall()
+    for kind, name, _sql in rows:
+        conn.execute(f'DROP {kind.upper()} "{name}"')
+    return [sql for _kind, _name, sql in rows]
+
+
+def insert(conn, sql, rows, batch_size):
+    """executemany in batches, one transaction per batch; returns the rows written"""
+    written = 0
+    for batch in batches(rows, batch_size):
+        conn.execute("BEGIN")
+        cursor = conn.executemany(sql, batch)
+        written += cursor.rowcount
+        conn.execute("COMMIT")
+    return written
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.timings = {}
+        # Likes and follows are stamped with the end of the recipe period
+        self.end_of_period = (datetime.strptime(args.start, "%Y-%m-%d")
+                              + timedelta(days=args.days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def step(self, name, fn):
+        started = time.perf_counter()
+        count = fn()
+        seconds = time.perf_counter() - started
+        self.timings[name] = seconds
+        rate = f", {count / seconds:,.0f}/s" if count and seconds > 0 else ""
+        print(f"{name:<12} {count or 0:>12,} rows  {seconds:8.1f}s{rate}", flush=True)
+
+    def users(self):
+        args = self.args
+        rng = self.rng
+        # Fixed timestamps instead of CURRENT_TIMESTAMP keep the output reproducible
+        created_at = f"{args.start} 00:00:00"
+        def rows():
+            for user_id in range(1, args.users + 1):
+                salt = f"{rng.getrandbits(32):08x}"
+                pass_hash = hashlib.sha256((PASSWORD + salt).encode()).hexdigest()
+                yield (user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{user_id}",
+                       f"user{user_id}@example.com", pass_hash, salt, created_at)
+        count = insert(self.conn, """
+            INSERT INTO users (id, first_name, last_name, username, email_address, pass_hash, salt,
+                               password_created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows(), args.batch)
+        self.conn.execute("BEGIN")
+        self.conn.execute("""
+            INSERT INTO password_history (user_id, pass_hash, created_at)
+            SELECT id, pass_hash, password_created_at FROM users
+        """)
+        self.conn.execute("COMMIT")
+        return count
+
+    def author(self, zipf):
+        """Celebrities first, then a Zipf-distributed long tail"""
+        args = self.args
+        if args.celebrities and self.rng.random() < args.celebrity_share:
+            return self.rng.randint(1, args.celebrities)
+        return zipf.draw() + 1
+
+    def recipes(self):
+        args = self.args
+        rng = self.rng
+        authors = Zipf(args.users, args.skew, rng)
+        vocabulary = STAPLES + [f"ingredient {n}" for n in range(max(0, args.vocabulary - len(STAPLES)))]
+        ingredient_ranks = Zipf(len(vocabulary), args.skew, rng)
+        start = datetime.strptime(args.start, "%Y-%m-%d")
+        step = timedelta(days=args.days) / max(1, args.recipes)
+        ingredient_rows = []
+
+        def rows():
+            for recipe_id in range(1, args.recipes + 1):
+                created_at = (start + step * (recipe_id - 1)).strftime("%Y-%m-%d %H:%M:%S")
+                count = rng.randint(args.min_ingredients, args.max_ingredients)
+                # dict, not set: set order depends on string hash randomization
+                chosen = dict.fromkeys(vocabulary[ingredient_ranks.draw()] for _ in range(count))
+                ingredient_rows.extend((recipe_id, ingredient) for ingredient in chosen)
+                yield (recipe_id, self.author(authors), f"{rng.choice(DISHES)} #{recipe_id}",
+                       f"Generated recipe {recipe_id}", created_at)
+
+        written = 0
+        for batch in batches(rows(), args.batch):
+            self.conn.execute("BEGIN")
+            self.conn.executemany("""
+                INSERT INTO recipes (recipe_id, user_id, name, description, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, batch)
+            # Insert order is created_at order, so seq agrees with the timestamps
+            self.conn.executemany("INSERT INTO recipe_inserts (recipe_id) VALUES (?)",
+                                  [(row[0],) for row in batch])
+            self.conn.executemany("INSERT INTO recipe_ingredients (recipe_id, ingredient) VALUES (?, ?)",
+                                  ingredient_rows)
+            self.conn.execute("COMMIT")
+            written += len(batch)
+            ingredient_rows.clear()
+        return written
+
+    def pairs(self, target, left, right, sql, allow_equal=True):
+        """Insert `target` distinct (left(), right()) pairs with INSERT OR IGNORE.
+
+        Duplicates are drawn again until the target is reached, or until
+        20 rounds in a row add nothing (the skew leaves too few new pairs).
+        """
+        written = 0
+        idle_rounds = 0
+        while written < target and idle_rounds < 20:
+            needed = target - written
+            def rows():
+                for _ in range(needed):
+                    a, b = left(), right()
+                    if allow_equal or a != b:
+                        yield (a, b, self.end_of_period)
+            added = insert(self.conn, sql, rows(), self.args.batch)
+            idle_rounds = 0 if added else idle_rounds + 1
+            written += added
+        return written
+
+    def likes(self):
+        args = self.args
+        rng = self.rng
+        if not args.recipes or not args.users:
+            return 0
+        hot = Zipf(args.recipes, args.skew, rng)
+        return self.pairs(min(args.likes, args.users * args.recipes),
+                          lambda: rng.randint(1, args.users), lambda: hot.draw() + 1,
+                          "INSERT OR IGNORE INTO likes (user_id, recipe_id, created_at) VALUES (?, ?, ?)")
+
+    def follows(self):
+        args = self.args
+        rng = self.rng
+        if args.users < 2:
+            return 0
+        popular = Zipf(args.users, args.skew, rng)
+        def followee():
+            if args.celebrities and rng.random() < args.celebrity_share:
+                return rng.randint(1, args.celebrities)
+            return popular.draw() + 1
+        return self.pairs(min(args.follows, args.users * (args.users - 1)),
+                          lambda: rng.randint(1, args.users), followee,
+                          "INSERT OR IGNORE INTO follows (follower_id, following_id, created_at) VALUES (?, ?, ?)",
+                          allow_equal=False)
+
+    def counters(self):
+        """Like counters and pull authors"""
+        conn = self.conn
+        conn.execute("BEGIN")
+        conn.execute("""
+            UPDATE recipes SET like_count = counts.n
+            FROM (SELECT recipe_id, COUNT(*) AS n FROM likes GROUP BY recipe_id) AS counts
+            WHERE recipes.recipe_id = counts.recipe_id
+        """)
+        conn.execute("""
+            UPDATE users SET pull_feed = 1
+            WHERE id IN (SELECT following_id FROM follows GROUP BY following_id HAVING COUNT(*) > ?)
+        """, (self.args.pull_threshold,))
+        conn.execute("COMMIT")
+        return None
+
+    def feeds(self):
+        """The timelines timelines.rebuild() would produce, built in one streaming pass.
+
+        rebuild() ranks every (follower, recipe) pair with a window
+        function, which takes hours at this scale.  Only an author's newest
+        feed_length recipes can reach any timeline, so those are kept per
+        push author and merged per follower instead.
+        """
+        conn = self.conn
+        limit = self.args.feed_length
+        newest = {}
+        for author_id, recipe_id, created_at, seq in conn.execute("""
+            SELECT r.user_id, r.recipe_id, r.created_at, ri.seq
+            FROM recipes r
+            JOIN users u ON u.id = r.user_id AND u.pull_feed = 0
+            JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+            ORDER BY r.user_id, r.created_at DESC, ri.seq DESC
+        """):
+            recipes = newest.setdefault(author_id, [])
+            if len(recipes) < limit:
+                recipes.append((created_at, seq, recipe_id))
+
+        lengths = []
+        def rows():
+            follows = conn.execute("SELECT follower_id, following_id FROM follows ORDER BY follower_id")
+            for follower_id, group in itertools.groupby(follows, key=lambda row: row[0]):
+                lists = [newest[author_id] for _, author_id in group if author_id in newest]
+                count = 0
+                for created_at, seq, recipe_id in itertools.islice(heapq.merge(*lists, reverse=True), limit):
+                    count += 1
+                    yield (follower_id, recipe_id, created_at, seq)
+                if count:
+                    lengths.append((count, follower_id))
+
+        # One connection may write while its own SELECT on follows is still stepping
+        written = insert(conn, """
+            INSERT INTO feed_entries (user_id, recipe_id, created_at, seq) VALUES (?, ?, ?, ?)
+        """, rows(), self.args.batch)
+        insert(conn, "UPDATE users SET feed_len = ? WHERE id = ?", lengths, self.args.batch)
+        return written
+
+    def run(self):
+        args = self.args
+        with schema_lock(args.db):
+            for path in (args.db, args.db + "-wal", args.db + "-shm", args.db + "-journal"):
+                if os.path.exists(path):
+                    os.remove(path)
+            conn = self.conn = sqlite3.connect(args.db, isolation_level=None)
+            try:
+                with open(args.sql, 'r') as sql_startup:
+                    conn.executescript(sql_startup.read())
+                migrate(conn)
+                conn.execute("PRAGMA journal_mode = OFF")
+                conn.execute("PRAGMA synchronous = OFF")
+                conn.execute(f"PRAGMA cache_size = {-args.cache_mb * 1024}")
+                # temp_store stays on disk: the index sorts can be far larger than memory
+                recreate = suspend_indexes_and_triggers(
+                    conn, ["users", "password_history", "recipes", "recipe_ingredients", "likes", "follows",
+                           "feed_entries"])
+                self.step("users", self.users)
+                self.step("recipes", self.recipes)
+                self.step("likes", self.likes)
+                self.step("follows", self.follows)
+                self.step("counters", self.counters)
+                self.step("timelines", self.feeds)
+                def rebuild_indexes():
+                    for sql in recreate:
+                        conn.execute(sql)
+                self.step("indexes", rebuild_indexes)
+                # The app's storage profiles switch to WAL on first connection
+                conn.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                conn.close()
+        print(f"{args.db}: {os.path.getsize(args.db) / 1e6:,.1f} MB in {sum(self.timings.values()):.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the recipe schema with a large, skewed synthetic dataset")
+    parser.add_argument('--db', default="project2.db", help="database file to (re)create")
+    parser.add_argument('--sql', default="project2.sql", help="version 0 schema")
+    parser.add_argument('--force', action='store_true', help="replace an existing database file")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--likes', type=int, default=1000000)
+    parser.add_argument('--follows', type=int, default=2000000)
+    parser.add_argument('--vocabulary', type=int, default=5000, help="distinct ingredients")
+    parser.add_argument('--min-ingredients', type=int, default=2)
+    parser.add_argument('--max-ingredients', type=int, default=10)
+    parser.add_argument('--skew', type=float, default=1.07, help="Zipf exponent for authors, likes, follows and ingredients")
+    parser.add_argument('--celebrities', type=int, default=10, help="authors drawing an extra share of recipes and follows")
+    parser.add_argument('--celebrity-share', type=float, default=0.05)
+    parser.add_argument('--start', default="2024-01-01", help="created_at of the first recipe")
+    parser.add_argument('--days', type=int, default=365, help="period the recipes are spread over")
+    parser.add_argument('--feed-length', type=int, default=int(os.environ.get('FEED_TIMELINE_LENGTH', '200')))
+    parser.add_argument('--pull-threshold', type=int, default=int(os.environ.get('FEED_PULL_THRESHOLD', '10000')))
+    parser.add_argument('--batch', type=int, default=100000, help="rows per executemany transaction")
+    parser.add_argument('--cache-mb', type=int, default=512, help="SQLite page cache during the load")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db) and not args.force:
+        parser.error(f"{args.db} exists; pass --force to replace it")
+    if args.min_ingredients < 1 or args.max_ingredients < args.min_ingredients:
+        parser.error("need 1 <= --min-ingredients <= --max-ingredients")
+    Generator(args).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+In-memory ingredient -> recipe inverted index for Project 2 - The Meals LAN
+"""
+
+import bisect
+import threading
+from array import array
+
+
+def _term(value):
+    """Normalise a pantry item the way the TEXT ingredient column compares it.
+
+    Returns None for values that can never match (NULL) and raises
+    TypeError for values SQLite could not bind, like the SQL search did.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    raise TypeError(f"unsupported ingredient value: {value!r}")
+
+
+class IngredientIndex:
+    """Posting lists of recipe ids per ingredient plus each recipe's ingredients.
+
+    A recipe matches a pantry when the number of its ingredients found in
+    the pantry equals its ingredient count, so a search only touches the
+    postings of the pantry's ingredients.  Posting lists are sorted
+    ``array('q')`` of recipe ids.  Mutators are no-ops until the index has
+    been built; the first reader builds it from the database.
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self._postings = {}
+        self._recipes = {}
+        self.built = False
+
+    def add(self, recipe_id, ingredients):
+        """Index a new recipe's ingredients"""
+        with self.lock:
+            if not self.built:
+                return
+            terms = tuple(sorted({_term(i) for i in ingredients} - {None}))
+            if not terms or recipe_id in self._recipes:
+                return
+            self._recipes[recipe_id] = terms
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = array('q')
+                postings.insert(bisect.bisect_left(postings, recipe_id), recipe_id)
+
+    def remove(self, recipe_id):
+        with self.lock:
+            if not self.built:
+                return
+            for term in self._recipes.pop(recipe_id, ()):
+                postings = self._postings[term]
+                index = bisect.bisect_left(postings, recipe_id)
+                if index < len(postings) and postings[index] == recipe_id:
+                    postings.pop(index)
+                if not postings:
+                    del self._postings[term]
+
+    def match(self, pantry):
+        """Sorted ids of recipes whose every ingredient is in the pantry"""
+        terms = {_term(item) for item in pantry}
+        with self.lock:
+            if None in terms:
+                # The SQL search used "ingredient NOT IN (...)", which is never
+                # true once the list holds a NULL, so every recipe matched
+                return sorted(self._recipes)
+            hits = {}
+            for term in terms:
+                for recipe_id in self._postings.get(term, ()):
+                    hits[recipe_id] = hits.get(recipe_id, 0) + 1
+            recipes = self._recipes
+            return sorted(r for r, n in hits.items() if n == len(recipes[r]))
+
+    def invalidate(self):
+        """Forget everything; the next reader rebuilds from the database"""
+        with self.lock:
+            self._postings = {}
+            self._recipes = {}
+            self.built = False
+
+    def rebuild(self, cursor):
+        """Load every recipe's ingredients from the database"""
+        cursor.execute("""
+            SELECT recipe_id, ingredient
+            FROM recipe_ingredients
+            ORDER BY ingredient, recipe_id
+        """)
+        postings = {}
+        recipes = {}
+        for recipe_id, ingredient in cursor.fetchall():
+            term = _term(ingredient)
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = array('q')
+            ids.append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(term)
+        with self.lock:
+            self._postings = postings
+            self._recipes = {r: tuple(sorted(terms)) for r, terms in recipes.items()}
+            self.built = True
+
+    def ensure_built(self, cursor):
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.rebuild(cursor)
+
+    def check(self, cursor):
+        """Compare the indexed ingredients of every recipe with the database"""
+        cursor.execute("SELECT recipe_id, ingredient FROM recipe_ingredients")
+        expected = {}
+        for recipe_id, ingredient in cursor.fetchall():
+            expected.setdefault(recipe_id, set()).add(_term(ingredient))
+        with self.lock:
+            actual = {r: set(terms) for r, terms in self._recipes.items()}
+            postings_ok = all(
+                list(ids) == sorted(ids) and all(term in actual.get(r, ()) for r in ids)
+                for term, ids in self._postings.items()
+            )
+        mismatched = sorted(r for r in set(expected) | set(actual) if expected.get(r) != actual.get(r))
+        return {"consistent": postings_ok and not mismatched, "recipes": len(actual),
+                "mismatched": mismatched[:20]}
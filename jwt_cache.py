@@ -0,0 +1,155 @@
+"""
+Verified-JWT and user-id caches for Project 2 - The Meals LAN
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_digest(token):
+    """Cache key for a token; the raw token itself is never stored"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """Bounded LRU mapping token digest -> verified claims.
+
+    Entries remember the secret-key generation they were verified under,
+    so a key rotation invalidates them even if a verification that started
+    before the rotation finishes after it.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, digest):
+        """Return cached claims or None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] != self.generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, digest, username, claims, generation):
+        """Remember claims verified under the given key generation"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[digest] = (generation, username, claims)
+            self._entries.move_to_end(digest)
+            self._by_user.setdefault(username, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                old_digest, (_, old_user, _) = self._entries.popitem(last=False)
+                self._forget(old_user, old_digest)
+                self.evictions += 1
+
+    def _forget(self, username, digest):
+        digests = self._by_user.get(username)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[username]
+
+    def invalidate_user(self, username):
+        """Drop every cached token of a user (e.g. after /delete)"""
+        with self._lock:
+            for digest in self._by_user.pop(username, ()):
+                self._entries.pop(digest, None)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop everything and start a new key generation"""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "max_size": self.max_size,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class UserIdCache:
+    """Bounded LRU mapping username -> users.id for tokens without a uid claim.
+
+    Entries expire after ``ttl`` seconds, which bounds how long another
+    worker process can keep serving the id of an account deleted elsewhere.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, username):
+        """Return the cached id or None"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username, user_id):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, user_id)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username):
+        """Forget a username (e.g. after /delete)"""
+        with self._lock:
+            if self._entries.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "max_size": self.max_size,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
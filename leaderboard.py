@@ -0,0 +1,120 @@
+"""
+In-memory "popular" leaderboard for Project 2 - The Meals LAN
+"""
+
+import bisect
+import threading
+
+# Same ordering (and tie-breaking) as the SQL popular query, for checking
+POPULAR_SQL = """
+    SELECT r.recipe_id
+    FROM recipes r
+    LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+    ORDER BY r.like_count DESC, r.created_at DESC, ri.seq DESC
+    LIMIT ?
+"""
+
+
+def _key(recipe_id, likes, created_at, seq):
+    # NULLs sort last under DESC in SQLite, so map them below any real value
+    return (likes, created_at or "", -1 if seq is None else seq, recipe_id)
+
+
+class PopularLeaderboard:
+    """Recipes kept sorted by (likes, created_at, insert seq).
+
+    The list is ascending, so the top K are the last K entries read
+    backwards: O(K) per read and O(log n) search plus a memmove per update.
+    All mutations happen under ``lock``; callers hold it across their
+    commit so updates are applied in commit order.  Mutators are no-ops
+    until the board has been built; the first reader builds it.
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self._keys = []
+        self._by_recipe = {}
+        self.built = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _discard(self, recipe_id):
+        key = self._by_recipe.pop(recipe_id, None)
+        if key is not None:
+            index = bisect.bisect_left(self._keys, key)
+            del self._keys[index]
+        return key
+
+    def add(self, recipe_id, likes, created_at, seq):
+        """Insert a recipe, replacing any previous entry for it"""
+        with self.lock:
+            if not self.built:
+                return
+            self._discard(recipe_id)
+            key = _key(recipe_id, likes, created_at, seq)
+            bisect.insort(self._keys, key)
+            self._by_recipe[recipe_id] = key
+
+    def adjust(self, recipe_id, delta):
+        """Change a recipe's like count by delta (ignored if unknown)"""
+        with self.lock:
+            if not self.built:
+                return
+            key = self._discard(recipe_id)
+            if key is None:
+                return
+            likes, created_at, seq, _ = key
+            key = (likes + delta, created_at, seq, recipe_id)
+            bisect.insort(self._keys, key)
+            self._by_recipe[recipe_id] = key
+
+    def remove(self, recipe_id):
+        with self.lock:
+            self._discard(recipe_id)
+
+    def top(self, k):
+        """Recipe ids of the k most popular recipes, best first"""
+        return [key[3] for key in self.page(k)]
+
+    def page(self, k, before=None):
+        """(likes, created_at, seq, recipe_id) keys of the k most popular
+        recipes ranked below ``before`` (a (likes, created_at, seq) key), best first"""
+        with self.lock:
+            if k <= 0:
+                return []
+            end = len(self._keys) if before is None else bisect.bisect_left(self._keys, tuple(before))
+            return self._keys[max(0, end - k):end][::-1]
+
+    def invalidate(self):
+        """Forget everything; the next reader rebuilds from the database"""
+        with self.lock:
+            self._keys = []
+            self._by_recipe = {}
+            self.built = False
+
+    def rebuild(self, cursor):
+        """Load every recipe's ranking key from the database"""
+        cursor.execute("""
+            SELECT r.recipe_id, r.like_count, r.created_at, ri.seq
+            FROM recipes r
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+        """)
+        keys = sorted(_key(*row) for row in cursor.fetchall())
+        with self.lock:
+            self._keys = keys
+            self._by_recipe = {key[3]: key for key in keys}
+            self.built = True
+
+    def ensure_built(self, cursor):
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.rebuild(cursor)
+
+    def check(self, cursor, k=10):
+        """Compare the in-memory top k with the SQL ranking"""
+        cursor.execute(POPULAR_SQL, (k,))
+        expected = [row[0] for row in cursor.fetchall()]
+        actual = self.top(k)
+        return {"consistent": actual == expected, "memory": actual, "sql": expected}
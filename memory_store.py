@@ -0,0 +1,152 @@
+"""
+In-memory storage with periodic disk snapshots for Project 2 - The Meals LAN
+
+The database lives in SQLite's memdb VFS, which every connection of this
+process can open by name and which, unlike shared-cache mode, keeps the
+normal file locking (so busy timeouts still apply).  It is loaded from the
+snapshot file at startup and written back with the backup API on an
+interval and at exit.  Each snapshot is first copied into a private
+in-memory database, so writers only wait for a memory copy, and then
+written to a temporary file that is renamed over the previous one, so the file on disk is always a complete,
+consistent database.  Anything committed after the last snapshot is lost
+if the process dies.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryStore:
+    """A process-wide in-memory database snapshotted to ``path``"""
+
+    def __init__(self, path, interval=30.0, name=None):
+        self.path = path
+        self.interval = interval
+        # memdb databases whose name starts with "/" are shared by every
+        # connection in the process
+        self.uri = f"file:/{name or os.path.basename(path)}-{os.getpid()}?vfs=memdb"
+        # The database is freed when its last connection closes
+        self._anchor = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+        self.snapshots = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_seconds = None
+        self.last_copy_seconds = None
+        self.max_copy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.total_seconds = 0.0
+        self.last_bytes = None
+        self.last_at = None
+
+    def connect(self):
+        return sqlite3.connect(self.uri, uri=True)
+
+    def load(self):
+        """Copy the snapshot file (if any) into memory; returns True if one was loaded"""
+        if not os.path.exists(self.path):
+            return False
+        source = sqlite3.connect(self.path)
+        try:
+            # memdb cannot open a database whose header says WAL, and the
+            # backup copies the header; the file is only a snapshot now
+            source.execute("PRAGMA journal_mode = DELETE")
+            source.backup(self._anchor)
+        finally:
+            source.close()
+        self.loaded = True
+        return True
+
+    def snapshot(self):
+        """Write the in-memory database to disk; returns the seconds it took.
+
+        The image is taken in one backup step into a private in-memory
+        database, so it is consistent and writers wait (within their busy
+        timeout) only for that memory copy.  Writing it to disk holds no
+        lock on the live database.
+        """
+        with self._lock:
+            started = time.perf_counter()
+            temp = self.path + ".snapshot"
+            try:
+                image = sqlite3.connect(':memory:')
+                try:
+                    source = self.connect()
+                    try:
+                        source.backup(image)
+                    finally:
+                        source.close()
+                    copy_seconds = time.perf_counter() - started
+                    dest = sqlite3.connect(temp)
+                    try:
+                        image.backup(dest)
+                    finally:
+                        dest.close()
+                finally:
+                    image.close()
+                # A journal left over from file mode must not be applied to the new file
+                for leftover in (self.path + "-wal", self.path + "-shm"):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                os.replace(temp, self.path)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                raise
+            seconds = time.perf_counter() - started
+            self.snapshots += 1
+            self.last_seconds = seconds
+            self.last_copy_seconds = copy_seconds
+            self.max_copy_seconds = max(self.max_copy_seconds, copy_seconds)
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.total_seconds += seconds
+            self.last_bytes = os.path.getsize(self.path)
+            self.last_at = time.time()
+            return seconds
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception:
+                # Counted in failures; try again next interval
+                pass
+
+    def start(self):
+        """Start the background snapshot thread (no-op if the interval is not positive)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='memory-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the snapshot thread and take a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.snapshot()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "interval": self.interval,
+                "loaded_snapshot": self.loaded,
+                "snapshots": self.snapshots,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "last_ms": None if self.last_seconds is None else round(self.last_seconds * 1000, 3),
+                "max_ms": round(self.max_seconds * 1000, 3),
+                "mean_ms": round(self.total_seconds / self.snapshots * 1000, 3) if self.snapshots else None,
+                # The part of a snapshot writers may have to wait for
+                "last_copy_ms": None if self.last_copy_seconds is None else round(self.last_copy_seconds * 1000, 3),
+                "max_copy_ms": round(self.max_copy_seconds * 1000, 3),
+                "last_bytes": self.last_bytes,
+                "last_at": self.last_at,
+            }
@@ -0,0 +1,106 @@
+"""
+Per-endpoint request metrics for Project 2 - The Meals LAN
+
+Histograms of handler time, time spent in SQLite, JSON serialization time
+and SQL statements per request, labelled by endpoint (the URL rule, so the
+label set stays bounded), rendered in the Prometheus text exposition
+format.
+"""
+
+import threading
+
+# Upper bounds in seconds (Prometheus' "le"); +Inf is implicit
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{_number(bound)}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {_number(self.sum)}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+# name -> (help, buckets)
+HISTOGRAMS = {
+    "meals_request_duration_seconds": ("Handler time per request, from routing to the finished response", LATENCY_BUCKETS),
+    "meals_request_db_seconds": ("Time per request spent executing SQL and fetching rows", LATENCY_BUCKETS),
+    "meals_request_json_seconds": ("Time per request spent serializing JSON", LATENCY_BUCKETS),
+    "meals_request_sql_statements": ("SQL statements executed per request", STATEMENT_BUCKETS),
+}
+
+
+class RequestMetrics:
+    """Thread-safe registry of per-endpoint request histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+
+    def observe(self, endpoint, method, status, seconds, db_seconds, json_seconds, statements):
+        values = (seconds, db_seconds, json_seconds, statements)
+        with self._lock:
+            histograms = self._histograms.get(endpoint)
+            if histograms is None:
+                histograms = self._histograms[endpoint] = [Histogram(buckets) for _help, buckets in HISTOGRAMS.values()]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+            key = (endpoint, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+    def render(self):
+        """Prometheus text exposition of everything observed so far"""
+        with self._lock:
+            lines = [
+                "# HELP meals_requests_total Responses by endpoint, method and HTTP status",
+                "# TYPE meals_requests_total counter",
+            ]
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'meals_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+            for index, (name, (help_text, _buckets)) in enumerate(HISTOGRAMS.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for endpoint in sorted(self._histograms):
+                    lines.extend(self._histograms[endpoint][index].render(name, f'endpoint="{_escape(endpoint)}"'))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
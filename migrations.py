@@ -0,0 +1,209 @@
+"""
+Versioned schema migrations for Project 2 - The Meals LAN
+
+project2.sql is the version 0 schema.  Each migration below moves the
+database forward by one PRAGMA user_version step and never drops data, so
+it can be applied to a live database as well as to a freshly created one.
+
+Usage: python migrations.py [database]
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows); fine for a single process
+    fcntl = None
+
+MIGRATIONS = [
+    (1, "secondary indexes for the hot query paths", """
+        -- like counts and the likes cascade when a recipe is deleted
+        CREATE INDEX IF NOT EXISTS idx_likes_recipe_id ON likes (recipe_id);
+        -- follows(follower_id) is already served by UNIQUE(follower_id, following_id);
+        -- the reverse direction is needed by the cascade when a followed user is deleted
+        CREATE INDEX IF NOT EXISTS idx_follows_following_id ON follows (following_id);
+        -- feed join and the recipes cascade when a user is deleted
+        CREATE INDEX IF NOT EXISTS idx_recipes_user_created ON recipes (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_ingredient ON recipe_ingredients (ingredient);
+        -- email uniqueness check in create_user
+        CREATE INDEX IF NOT EXISTS idx_users_email_address ON users (email_address);
+        CREATE INDEX IF NOT EXISTS idx_password_history_user_id ON password_history (user_id);
+    """),
+    (2, "denormalized per-recipe like counter", """
+        ALTER TABLE recipes ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE recipes SET like_count = (
+            SELECT COUNT(*) FROM likes WHERE likes.recipe_id = recipes.recipe_id
+        );
+        -- Cascading deletes from /delete fire these too, so the counter
+        -- stays exact whether a like is removed directly or by a cascade
+        CREATE TRIGGER IF NOT EXISTS trg_likes_count_insert AFTER INSERT ON likes
+        BEGIN
+            UPDATE recipes SET like_count = like_count + 1 WHERE recipe_id = NEW.recipe_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_likes_count_delete AFTER DELETE ON likes
+        BEGIN
+            UPDATE recipes SET like_count = like_count - 1 WHERE recipe_id = OLD.recipe_id;
+        END;
+        CREATE INDEX IF NOT EXISTS idx_recipes_popular ON recipes (like_count DESC, created_at DESC);
+    """),
+    (3, "fan-out-on-write feed timelines", """
+        -- pull_feed: sticky flag for authors whose recipes are pulled at read time
+        ALTER TABLE users ADD COLUMN pull_feed INTEGER NOT NULL DEFAULT 0;
+        -- feed_len: upper bound on the user's timeline length, used to amortise trimming
+        ALTER TABLE users ADD COLUMN feed_len INTEGER NOT NULL DEFAULT 0;
+        CREATE TABLE IF NOT EXISTS feed_entries (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            created_at DATETIME,
+            seq INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (recipe_id) REFERENCES recipes (recipe_id) ON DELETE CASCADE,
+            UNIQUE(user_id, recipe_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_feed_entries_timeline ON feed_entries (user_id, created_at DESC, seq DESC);
+        CREATE INDEX IF NOT EXISTS idx_feed_entries_recipe_id ON feed_entries (recipe_id);
+        CREATE INDEX IF NOT EXISTS idx_users_pull_feed ON users (id) WHERE pull_feed = 1;
+        -- Backfill with the default FEED_TIMELINE_LENGTH of 200 entries per user
+        INSERT INTO feed_entries (user_id, recipe_id, created_at, seq)
+        SELECT follower_id, recipe_id, created_at, seq FROM (
+            SELECT f.follower_id, r.recipe_id, r.created_at, ri.seq,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY f.follower_id
+                       ORDER BY r.created_at DESC, ri.seq DESC
+                   ) AS position
+            FROM follows f
+            JOIN recipes r ON r.user_id = f.following_id
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+        )
+        WHERE position <= 200;
+        UPDATE users SET feed_len = (SELECT COUNT(*) FROM feed_entries WHERE user_id = users.id);
+    """),
+    (4, "never reuse user ids", """
+        -- v2 tokens carry the user id, so the id of a deleted account must not
+        -- be handed to the next one.  SQLite can only add AUTOINCREMENT by
+        -- rebuilding the table (migrate() turns foreign keys off around this).
+        CREATE TABLE users_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            email_address TEXT NOT NULL,
+            pass_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            password_created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            pull_feed INTEGER NOT NULL DEFAULT 0,
+            feed_len INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO users_new (id, first_name, last_name, username, email_address, pass_hash,
+                               salt, password_created_at, pull_feed, feed_len)
+        SELECT id, first_name, last_name, username, email_address, pass_hash,
+               salt, password_created_at, pull_feed, feed_len
+        FROM users;
+        DROP TABLE users;
+        ALTER TABLE users_new RENAME TO users;
+        CREATE INDEX IF NOT EXISTS idx_users_email_address ON users (email_address);
+        CREATE INDEX IF NOT EXISTS idx_users_pull_feed ON users (id) WHERE pull_feed = 1;
+    """),
+    (5, "unique email addresses", """
+        -- create_user relies on the constraint instead of a SELECT beforehand.
+        -- Fails (and leaves the database at version 4) if duplicates exist.
+        DROP INDEX IF EXISTS idx_users_email_address;
+        CREATE UNIQUE INDEX idx_users_email_address ON users (email_address);
+    """),
+    (6, "shared change counters for per-process caches", """
+        -- Writers bump a counter per kind of change in their transaction, so
+        -- a process can tell that another one changed what its in-memory
+        -- indexes were built from.  generation changes whenever the database
+        -- is reset, so counters starting over are never mistaken for old ones.
+        CREATE TABLE IF NOT EXISTS data_versions (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL,
+            recipes INTEGER NOT NULL DEFAULT 0,
+            likes INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO data_versions (id, generation) VALUES (1, random());
+    """),
+    (7, "change counter for accounts", """
+        -- Bumped by create_user and /delete so other processes drop the
+        -- username -> id mappings they cached
+        ALTER TABLE data_versions ADD COLUMN users INTEGER NOT NULL DEFAULT 0;
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """Return the schema version stored in PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+@contextmanager
+def schema_lock(database):
+    """Exclusive advisory lock on <database>.lock for schema creation and migration.
+
+    Processes starting together (e.g. every worker of a pre-forking server)
+    take turns; the ones that get the lock later find the schema current.
+    """
+    if fcntl is None or database == ':memory:':
+        yield
+        return
+    fd = os.open(database + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def has_schema(conn):
+    """True if the database already holds the tables from project2.sql"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+    ).fetchone() is not None
+
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of versions that were applied.
+    """
+    applied = []
+    current = schema_version(conn)
+    if current >= LATEST_VERSION:
+        return applied
+    # Table rebuilds drop and rename tables that others reference; the
+    # pragma is a no-op inside a transaction, so switch it off up front
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, _description, script in MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+            except:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return applied
+
+
+if __name__ == '__main__':
+    database = sys.argv[1] if len(sys.argv) > 1 else "project2.db"
+    with schema_lock(database):
+        conn = sqlite3.connect(database)
+        try:
+            before = schema_version(conn)
+            applied = migrate(conn)
+            print(f"{database}: version {before} -> {schema_version(conn)} (applied {applied or 'nothing'})")
+        finally:
+            conn.close()
@@ -0,0 +1,173 @@
+"""
+Password hashing for Project 2 - The Meals LAN
+
+Stored hashes are self-describing:
+
+    <64 hex digits>                     sha256(password + salt), the original format
+    pbkdf2_sha256$<iterations>$<hex>    PBKDF2-HMAC-SHA256
+    scrypt$<n>$<r>$<p>$<hex>            scrypt
+
+Expensive KDFs run on a small bounded thread pool (hashlib releases the
+GIL while it works), so a burst of logins occupies at most that many
+cores.  Once ``max_pending`` hashes are queued or running, new requests
+are turned away immediately with HashingOverloaded instead of queueing
+behind them.
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+KDFS = ("sha256", "pbkdf2", "scrypt")
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing pool is full or a hash did not finish in time"""
+
+
+def _sha256(password, salt):
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=32).hex()
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"count": len(ordered), "p50_ms": at(0.50), "p95_ms": at(0.95),
+            "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+class PasswordHasher:
+    """Hashes new passwords with the configured KDF and verifies any stored format"""
+
+    def __init__(self, kdf="sha256", pbkdf2_iterations=600000, scrypt_n=2 ** 14, scrypt_r=8,
+                 scrypt_p=1, workers=2, max_pending=16, timeout=10.0):
+        if kdf not in KDFS:
+            raise ValueError(f"unknown password KDF {kdf!r} (expected one of {', '.join(KDFS)})")
+        self.kdf = kdf
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._hash_seconds = deque(maxlen=1024)
+        self._wait_seconds = deque(maxlen=1024)
+
+    def _encode(self, password, salt):
+        # Runs on a pool thread for the expensive KDFs
+        if self.kdf == "pbkdf2":
+            return f"pbkdf2_sha256${self.pbkdf2_iterations}${_pbkdf2(password, salt, self.pbkdf2_iterations)}"
+        if self.kdf == "scrypt":
+            n, r, p = self.scrypt_params
+            return f"scrypt${n}${r}${p}${_scrypt(password, salt, n, r, p)}"
+        return _sha256(password, salt)
+
+    def _compute(self, stored, password, salt):
+        """Recompute a stored hash from the password; None for unknown formats"""
+        parts = stored.split('$')
+        if len(parts) == 1:
+            return _sha256(password, salt)
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 3:
+            return f"pbkdf2_sha256${parts[1]}${_pbkdf2(password, salt, int(parts[1]))}"
+        if parts[0] == "scrypt" and len(parts) == 5:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            return f"scrypt${n}${r}${p}${_scrypt(password, salt, n, r, p)}"
+        return None
+
+    def _current_prefix(self):
+        if self.kdf == "pbkdf2":
+            return f"pbkdf2_sha256${self.pbkdf2_iterations}$"
+        if self.kdf == "scrypt":
+            return "scrypt${}${}${}$".format(*self.scrypt_params)
+        return None
+
+    def _run(self, expensive, fn, *args):
+        """Run fn inline if it is cheap, otherwise on the pool with admission control"""
+        if not expensive:
+            started = time.perf_counter()
+            result = fn(*args)
+            self._hash_seconds.append(time.perf_counter() - started)
+            return result
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded("password hashing queue is full")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait_seconds.append(started - submitted)
+                    self._hash_seconds.append(finished - started)
+
+        def done(_future):
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+        future = self._executor.submit(timed)
+        future.add_done_callback(done)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise HashingOverloaded("password hashing timed out")
+
+    def hash(self, password, salt):
+        """Hash a new password with the configured KDF"""
+        return self._run(self.kdf != "sha256", self._encode, password, salt)
+
+    def verify(self, password, salt, stored):
+        """Return (matches, needs_rehash) for a stored hash in any supported format"""
+        expensive = '$' in stored
+        computed = self._run(expensive, self._compute, stored, password, salt)
+        if computed is None or not hmac.compare_digest(computed, stored):
+            return False, False
+        prefix = self._current_prefix()
+        if prefix is None:
+            return True, False
+        return True, not stored.startswith(prefix)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kdf": self.kdf,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "hash_latency": _percentiles(list(self._hash_seconds)),
+                "queue_wait": _percentiles(list(self._wait_seconds)),
+            }
@@ -0,0 +1,65 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+def make_user(name):
+    u={'first_name':'Bat','last_name':'Ch','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+    return {'Authorization':requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+
+try:
+    requests.get(BASE+"/clear")
+
+    users = {name: make_user(name) for name in ['qa', 'qb', 'qc']}
+    for rid, author in [(7000,'qa'), (7001,'qa'), (7002,'qb')]:
+        if not ok(requests.post(BASE+"/create_recipe", data={'name':f'R{rid}','description':'d','recipe_id':rid}, headers=users[author])): fail()
+    if not ok(requests.post(BASE+"/like", data={'recipe_id':7001}, headers=users['qc'])): fail()
+
+    # already liked, missing recipe, repeat in batch and junk ids all fail individually
+    res = requests.post(BASE+"/like_batch", data={'recipe_ids':json.dumps([7000, 7001, 9999, 7002, 7000, 'x', 0])},
+                        headers=users['qc']).json()
+    if res.get('status') != 1 or res['data'] != [1, 2, 2, 1, 2, 2, 2]: fail()
+    # JSON bodies can carry the list itself
+    res = requests.post(BASE+"/like_batch", json={'recipe_ids':[7002, '7000']}, headers=users['qa']).json()
+    if res['data'] != [1, 1]: fail()
+    res = requests.get(BASE+"/view_recipe/7000", params={'likes':'True'}, headers=users['qa']).json()
+    if res['data']['likes'] != '2': fail()
+    # 0 is an id like any other; booleans, floats, nulls and lists are not ids
+    for rid in [0, 1]:
+        if not ok(requests.post(BASE+"/create_recipe", data={'name':'Z','description':'d','recipe_id':str(rid)}, headers=users['qc'])): fail()
+    res = requests.post(BASE+"/like_batch", json={'recipe_ids':[True, 1.0, None, [1], {}, '', 0, '0']}, headers=users['qa']).json()
+    if res.get('status') != 1 or res['data'] != [2, 2, 2, 2, 2, 2, 1, 2]: fail()
+    for rid, likes in [(0, '1'), (1, '0')]:
+        res = requests.get(BASE+"/view_recipe/%d" % rid, params={'likes':'True'}, headers=users['qa']).json()
+        if res['data']['likes'] != likes: fail()
+
+    # self, unknown user, repeats and an existing follow fail individually
+    if not ok(requests.post(BASE+"/follow", data={'username':'qb'}, headers=users['qc'])): fail()
+    res = requests.post(BASE+"/follow_batch", data={'usernames':json.dumps(['qa', 'qc', 'nobody', 'qa', 'qb', ''])},
+                        headers=users['qc']).json()
+    if res.get('status') != 1 or res['data'] != [1, 2, 2, 2, 2, 2]: fail()
+
+    # the new follow was backfilled into the feed
+    res = requests.get(BASE+"/search", params={'feed':'True'}, headers=users['qc']).json()
+    if set(res['data'].keys()) != {'7001', '7002'}: fail()
+
+    # malformed lists and bad tokens
+    if ok(requests.post(BASE+"/like_batch", data={'recipe_ids':'7000'}, headers=users['qc'])): fail()
+    if ok(requests.post(BASE+"/follow_batch", data={'usernames':'[qa'}, headers=users['qc'])): fail()
+    if ok(requests.post(BASE+"/like_batch", data={'recipe_ids':'[7000]'}, headers={'Authorization':'bad'})): fail()
+
+    check = requests.get(BASE+"/consistency").json()
+    for result in check['data'].values():
+        if not result['consistent']: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
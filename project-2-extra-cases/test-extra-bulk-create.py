@@ -0,0 +1,89 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+def make_user(name):
+    u={'first_name':'Bulk','last_name':'Load','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+    return {'Authorization':requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+
+try:
+    requests.get(BASE+"/clear")
+
+    author = make_user('ba')
+    reader = make_user('bb')
+    if not ok(requests.post(BASE+"/follow", data={'username':'ba'}, headers=reader)): fail()
+    if not ok(requests.post(BASE+"/create_recipe", data={'name':'Old','description':'d','recipe_id':6000}, headers=author)): fail()
+
+    # JSON array; statuses follow create_recipe's rules item by item
+    batch = [
+        {'recipe_id':6000, 'name':'Dup', 'description':'d'},                            # exists
+        {'recipe_id':6001, 'name':'A', 'description':'d', 'ingredients':'["egg","milk"]'},
+        {'recipe_id':6002, 'name':'B', 'description':'d', 'ingredients':['egg']},       # list form
+        {'recipe_id':6003, 'name':'C', 'description':'d', 'ingredients':'["egg","egg"]'},  # rejected by the db
+        {'recipe_id':6003, 'name':'C', 'description':'d', 'ingredients':'["egg"]'},        # same id, now fine
+        {'recipe_id':6004, 'name':'', 'description':'d'},                               # missing name
+        {'recipe_id':'x', 'name':'E', 'description':'d'},                               # bad id
+        {'recipe_id':6005, 'name':'F', 'description':'d', 'ingredients':'not json'},
+        'not an object',
+    ]
+    res = requests.post(BASE+"/create_recipes", json=batch, headers=author).json()
+    if res.get('status') != 1 or res['data'] != [2, 1, 1, 2, 1, 2, 2, 2, 2]: fail()
+
+    # NDJSON stream, including an undecodable line
+    lines = [json.dumps({'recipe_id':rid, 'name':f'N{rid}', 'description':'d', 'ingredients':['salt']})
+             for rid in range(6100, 6110)]
+    lines.insert(3, '{broken')
+    res = requests.post(BASE+"/create_recipes", data='\n'.join(lines),
+                        headers=dict(author, **{'Content-Type':'application/x-ndjson'})).json()
+    if res.get('status') != 1 or res['data'] != [1, 1, 1, 2] + [1] * 7: fail()
+
+    # bulk-created recipes show up in views, feeds and ingredient search
+    res = requests.get(BASE+"/view_recipe/6003", params={'ingredients':'True'}, headers=reader).json()
+    if res.get('status') != 1 or res['data']['ingredients'] != ['egg']: fail()
+    res = requests.get(BASE+"/search", params={'feed':'True'}, headers=reader).json()
+    if set(res['data'].keys()) != {'6108', '6109'}: fail()
+    res = requests.get(BASE+"/search", params={'ingredients':json.dumps(['egg'])}, headers=reader).json()
+    if set(res['data'].keys()) != {'6002', '6003'}: fail()
+
+    # a stream that fails part way (here by outgrowing the body limit)
+    # still reports the chunks committed before the failure
+    def oversized():
+        for rid in range(7000, 8500):
+            yield (json.dumps({'recipe_id':rid, 'name':'O', 'description':'d'}) + '\n').encode()
+        pad = b' ' * (1 << 20) + b'\n'
+        for _ in range(70):
+            yield pad
+    r = requests.post(BASE+"/create_recipes", data=oversized(),
+                      headers=dict(author, **{'Content-Type':'application/x-ndjson'}))
+    written = 0
+    if r.status_code == 200:
+        res = r.json()
+        written = res['data'].count(1)
+        if res['data'] != [1] * written + [2] * (len(res['data']) - written): fail()
+        if res['status'] != (1 if written == 1500 else 2): fail()
+    elif r.status_code != 413:
+        fail()
+    for rid, created in [(7000, written > 0), (7000 + written, False)]:
+        res = requests.get(BASE+"/view_recipe/%d" % rid, params={'name':'True'}, headers=reader).json()
+        if (res.get('status') == 1) != created: fail()
+
+    # bad body / bad token
+    if ok(requests.post(BASE+"/create_recipes", json={'recipe_id':1}, headers=author)): fail()
+    if ok(requests.post(BASE+"/create_recipes", json=batch, headers={'Authorization':'bad'})): fail()
+
+    check = requests.get(BASE+"/consistency").json()
+    for result in check['data'].values():
+        if not result['consistent']: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
@@ -0,0 +1,46 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+def stats():
+    return requests.get(BASE+"/stats").json()['data']
+
+try:
+    requests.get(BASE+"/clear")
+
+    u = {'first_name':'Cl','last_name':'Ea','username':'cla','email_address':'cla@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    for attempt in range(3):
+        if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+        h = {'Authorization':requests.post(BASE+"/login", data={'username':'cla','password':'Qx7Yt9Lp'}).json()['jwt']}
+        if not ok(requests.post(BASE+"/create_recipe", data={
+            'name':'Tea','description':'d','recipe_id':9300,'ingredients':json.dumps(['leaf'])
+        }, headers=h)): fail()
+        if not ok(requests.post(BASE+"/like", data={'recipe_id':9300}, headers=h)): fail()
+        res = requests.get(BASE+"/view_recipe/9300", params={'likes':'True'}, headers=h).json()
+        if res['data'] != {'likes':'1'}: fail()
+
+        before = stats()
+        if not ok(requests.get(BASE+"/clear")): fail()
+        after = stats()
+
+        # everything is gone, caches included
+        if requests.post(BASE+"/login", data={'username':'cla','password':'Qx7Yt9Lp'}).json().get('status') != 2: fail()
+        if requests.get(BASE+"/view_recipe/9300", params={'name':'True'}, headers=h).json().get('status') != 2: fail()
+        if after['recipe_versions']['size'] != 0 or after['user_id_cache']['size'] != 0: fail()
+
+        # the template reset rewrites the file in place and keeps the pool
+        if after['clear']['mode'] == 'template':
+            if after['clear']['template_restores'] != before['clear']['template_restores'] + 1: fail()
+            if after['pool']['misses'] != before['pool']['misses']: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
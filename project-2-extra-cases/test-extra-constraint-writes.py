@@ -0,0 +1,52 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def status(r):
+    return r.json().get('status')
+
+def user(name, email):
+    return {'first_name':'Co','last_name':'Ns','username':name,'email_address':email,'password':'Qx7Yt9Lp','salt':'s'}
+
+try:
+    requests.get(BASE+"/clear")
+
+    if status(requests.post(BASE+"/create_user", data=user('ca', 'ca@x.com'))) != 1: fail()
+    if status(requests.post(BASE+"/create_user", data=user('cb', 'cb@x.com'))) != 1: fail()
+
+    # duplicate username wins over duplicate email, as before
+    if status(requests.post(BASE+"/create_user", data=user('ca', 'cb@x.com'))) != 2: fail()
+    if status(requests.post(BASE+"/create_user", data=user('ca', 'new@x.com'))) != 2: fail()
+    if status(requests.post(BASE+"/create_user", data=user('cc', 'cb@x.com'))) != 3: fail()
+
+    ca = {'Authorization':requests.post(BASE+"/login", data={'username':'ca','password':'Qx7Yt9Lp'}).json()['jwt']}
+    cb = {'Authorization':requests.post(BASE+"/login", data={'username':'cb','password':'Qx7Yt9Lp'}).json()['jwt']}
+
+    recipe = {'name':'Pie','description':'d','recipe_id':9100,'ingredients':json.dumps(['apple'])}
+    if status(requests.post(BASE+"/create_recipe", data=recipe, headers=ca)) != 1: fail()
+    if status(requests.post(BASE+"/create_recipe", data=recipe, headers=cb)) != 2: fail()
+
+    # likes: missing recipe and repeated like are both refused
+    if status(requests.post(BASE+"/like", data={'recipe_id':9199}, headers=cb)) != 2: fail()
+    if status(requests.post(BASE+"/like", data={'recipe_id':9100}, headers=cb)) != 1: fail()
+    if status(requests.post(BASE+"/like", data={'recipe_id':9100}, headers=cb)) != 2: fail()
+
+    # follows: unknown user, yourself and a repeat are refused
+    if status(requests.post(BASE+"/follow", data={'username':'nobody'}, headers=cb)) != 2: fail()
+    if status(requests.post(BASE+"/follow", data={'username':'cb'}, headers=cb)) != 2: fail()
+    if status(requests.post(BASE+"/follow", data={'username':'ca'}, headers=cb)) != 1: fail()
+    if status(requests.post(BASE+"/follow", data={'username':'ca'}, headers=cb)) != 2: fail()
+
+    res = requests.get(BASE+"/view_recipe/9100", params={'likes':'True'}, headers=cb).json()
+    if res.get('data') != {'likes':'1'}: fail()
+    res = requests.get(BASE+"/search", params={'feed':'True'}, headers=cb).json()
+    if res.get('status') != 1 or set(res['data'].keys()) != {'9100'}: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
@@ -0,0 +1,55 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+try:
+    requests.get(BASE+"/clear")
+
+    users = {}
+    for name in ['fa', 'fb', 'fc', 'reader']:
+        u={'first_name':'Feed','last_name':'Time','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+        if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+        jwt=requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']
+        users[name]={'Authorization':jwt}
+
+    def create(rid, author):
+        if not ok(requests.post(BASE+"/create_recipe", data={
+            'name':f'R{rid}','description':'d','recipe_id':rid,'ingredients':json.dumps(['x'])
+        }, headers=users[author])): fail()
+
+    def feed():
+        res = requests.get(BASE+"/search", params={'feed':'True'}, headers=users['reader']).json()
+        if res.get('status') != 1: fail()
+        return set(res['data'].keys())
+
+    # recipes created before the follow are backfilled into the timeline
+    create(4000, 'fa')
+    create(4001, 'fa')
+    if not ok(requests.post(BASE+"/follow", data={'username':'fa'}, headers=users['reader'])): fail()
+    if feed() != {'4000', '4001'}: fail()
+
+    # recipes created after the follow are fanned out to it
+    if not ok(requests.post(BASE+"/follow", data={'username':'fb'}, headers=users['reader'])): fail()
+    create(4002, 'fb')
+    create(4003, 'fb')
+    if feed() != {'4002', '4003'}: fail()
+
+    # unfollowed authors never show up
+    create(4004, 'fc')
+    if feed() != {'4002', '4003'}: fail()
+
+    # deleting fb brings fa's older recipes back
+    if not ok(requests.post(BASE+"/delete", data={'username':'fb'}, headers=users['fb'])): fail()
+    if feed() != {'4000', '4001'}: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
@@ -0,0 +1,81 @@
+import requests
+import signal
+import time
+import os
+
+BASE = "http://127.0.0.1:5000"
+# The server is expected to run from the repository root, next to key.txt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY_FILE = os.path.join(ROOT, 'key.txt')
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def rotations():
+    return requests.get(BASE+"/stats").json()['data']['jwt_key']['rotations']
+
+def reload_key(pid, key):
+    """Write key.txt and signal the server, then wait for it to switch"""
+    before = rotations()
+    with open(KEY_FILE, 'w') as f:
+        f.write(key)
+    os.kill(pid, signal.SIGHUP)
+    deadline = time.time() + 10
+    while rotations() == before:
+        if time.time() > deadline: fail()
+        time.sleep(0.1)
+
+def accepted(token):
+    return requests.get(BASE+"/search", params={'popular':'True'}, headers={'Authorization':token}).json().get('status') == 1
+
+with open(KEY_FILE) as f:
+    original = f.read()
+rotated = False
+try:
+    stats = requests.get(BASE+"/stats").json()['data']
+    if not hasattr(signal, 'SIGHUP'):
+        print('Test Passed')
+        raise SystemExit
+
+    requests.get(BASE+"/clear")
+    u = {'first_name':'Ro','last_name':'Ta','username':'rota','email_address':'rota@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+    old = requests.post(BASE+"/login", data={'username':'rota','password':'Qx7Yt9Lp'}).json()['jwt']
+    if not accepted(old): fail()
+
+    rotated = True
+    reload_key(stats['pid'], original.strip() + '-rotated\n')
+    grace = requests.get(BASE+"/stats").json()['data']['jwt_key']['previous_valid_for']
+
+    # Tokens from before the rotation work only during the grace period
+    if accepted(old) != (grace > 0): fail()
+    # New tokens are signed with the new key
+    new = requests.post(BASE+"/login", data={'username':'rota','password':'Qx7Yt9Lp'}).json()['jwt']
+    if new == old or not accepted(new): fail()
+
+    # An unchanged key.txt is not a rotation
+    before = rotations()
+    os.kill(stats['pid'], signal.SIGHUP)
+    time.sleep(0.5)
+    if rotations() != before: fail()
+
+    # Rotating back: the original key is current again
+    reload_key(stats['pid'], original)
+    rotated = False
+    if not accepted(old): fail()
+    if accepted(new) != (grace > 0): fail()
+
+    print('Test Passed')
+except SystemExit:
+    raise
+except:
+    print('Test Failed')
+finally:
+    if rotated:
+        with open(KEY_FILE, 'w') as f:
+            f.write(original)
+        try:
+            os.kill(requests.get(BASE+"/stats").json()['data']['pid'], signal.SIGHUP)
+        except:
+            pass
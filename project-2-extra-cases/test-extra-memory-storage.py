@@ -0,0 +1,56 @@
+import requests
+import sqlite3
+import subprocess
+import sys
+import time
+import os
+
+BASE = "http://127.0.0.1:5000"
+# The server is expected to run from the repository root, next to project2.db
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def storage():
+    return requests.get(BASE+"/stats").json()['data']['storage']
+
+try:
+    requests.get(BASE+"/clear")
+
+    u = {'first_name':'Me','last_name':'Mo','username':'mem','email_address':'mem@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+
+    info = storage()
+    if info['mode'] == 'file':
+        if info['snapshots'] is not None: fail()
+    elif info['mode'] == 'memory':
+        # the user reaches project2.db with a later snapshot
+        snapshots = info['snapshots']
+        if snapshots['interval'] > 0:
+            deadline = time.time() + snapshots['interval'] * 2 + 5
+            while storage()['snapshots']['snapshots'] == snapshots['snapshots']:
+                if time.time() > deadline: fail()
+                time.sleep(0.1)
+            after = storage()['snapshots']
+            if after['failures'] != 0 or after['last_ms'] is None or not after['last_bytes']: fail()
+            # writers only wait for the in-memory copy, part of the whole snapshot
+            if after['last_copy_ms'] is None or after['last_copy_ms'] > after['last_ms']: fail()
+            db = sqlite3.connect(os.path.join(ROOT, 'project2.db'))
+            if db.execute("SELECT COUNT(*) FROM users WHERE username = 'mem'").fetchone()[0] != 1: fail()
+            db.close()
+
+            # a script importing app loads the snapshot but never writes it back
+            script = "import app; c = app.connect_db(); c.execute('DELETE FROM users'); c.commit(); c.close()"
+            env = dict(os.environ, STORAGE_MODE='memory', SNAPSHOT_INTERVAL='0.1')
+            if subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, timeout=60).returncode != 0: fail()
+            db = sqlite3.connect(os.path.join(ROOT, 'project2.db'))
+            if db.execute("SELECT COUNT(*) FROM users WHERE username = 'mem'").fetchone()[0] != 1: fail()
+            db.close()
+    else:
+        fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
@@ -0,0 +1,53 @@
+import requests
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def samples(text):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+try:
+    res = requests.get(BASE+"/metrics")
+    if res.status_code == 404:
+        # METRICS_ENABLED is off
+        print('Test Passed')
+        raise SystemExit
+    if res.status_code != 200 or not res.headers['Content-Type'].startswith('text/plain'): fail()
+
+    requests.get(BASE+"/clear")
+    before = samples(requests.get(BASE+"/metrics").text)
+    u = {'first_name':'Me','last_name':'Tr','username':'metr','email_address':'metr@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+    requests.get(BASE+"/view_recipe/7")
+    requests.get(BASE+"/no_such_page")
+    after = samples(requests.get(BASE+"/metrics").text)
+
+    def grew(name, labels):
+        key = '%s{%s}' % (name, labels)
+        return after.get(key, 0) - before.get(key, 0)
+
+    # one more request per endpoint, labelled by the URL rule, not the path
+    if grew('meals_request_duration_seconds_count', 'endpoint="/view_recipe/<int:recipe_id>"') != 1: fail()
+    if 'meals_request_duration_seconds_count{endpoint="/view_recipe/7"}' in after: fail()
+    user = 'endpoint="/create_user"'
+    if grew('meals_request_duration_seconds_count', user) != 1: fail()
+    if grew('meals_request_sql_statements_sum', user) < 1: fail()
+    if grew('meals_request_db_seconds_sum', user) <= 0: fail()
+    if grew('meals_request_json_seconds_sum', user) <= 0: fail()
+    if after['meals_request_duration_seconds_bucket{%s,le="+Inf"}' % user] != after['meals_request_duration_seconds_count{%s}' % user]: fail()
+    if grew('meals_requests_total', user + ',method="POST",status="200"') != 1: fail()
+    if grew('meals_requests_total', 'endpoint="unmatched",method="GET",status="404"') != 1: fail()
+
+    print('Test Passed')
+except SystemExit:
+    raise
+except:
+    print('Test Failed')
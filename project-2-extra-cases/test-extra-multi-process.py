@@ -0,0 +1,142 @@
+import requests
+import json
+import base64
+import subprocess
+import sys
+import os
+import time
+
+BASE = "http://127.0.0.1:5000"
+# A second worker process serving the same database file
+OTHER = "http://127.0.0.1:5001"
+# The server is expected to run from the repository root, next to project2.db
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+worker = None
+try:
+    if requests.get(BASE+"/stats").json()['data']['storage']['mode'] == 'memory':
+        # An in-memory database belongs to one process
+        print('Test Passed')
+        raise SystemExit
+
+    requests.get(BASE+"/clear")
+    worker = subprocess.Popen([sys.executable, '-c', 'import app; app.app.run(port=5001)'], cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while True:
+        try:
+            requests.get(OTHER+"/stats", timeout=1)
+            break
+        except requests.ConnectionError:
+            if time.time() > deadline: fail()
+            time.sleep(0.2)
+
+    tokens = {}
+    for name in ['mpa', 'mpb']:
+        u = {'first_name':'Mu','last_name':'Lt','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+        if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+        tokens[name] = {'Authorization': requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+    for rid in ['501', '502', '503']:
+        r = {'recipe_id':rid,'name':'M'+rid,'description':'d','ingredients':'["rice"]'}
+        if requests.post(BASE+"/create_recipe", data=r, headers=tokens['mpa']).json().get('status') != 1: fail()
+
+    def popular(base):
+        return set(requests.get(base+"/search", params={'popular':'True'}, headers=tokens['mpa']).json()['data'])
+
+    def pantry(base, items):
+        res = requests.get(base+"/search", params={'ingredients':json.dumps(items)}, headers=tokens['mpa']).json()
+        return set(res['data'])
+
+    # Both workers build their in-memory state
+    if popular(BASE) != {'502', '503'} or popular(OTHER) != {'502', '503'}: fail()
+    if pantry(BASE, ['rice', 'beans']) != {'501', '502', '503'}: fail()
+    if pantry(OTHER, ['rice', 'beans']) != {'501', '502', '503'}: fail()
+
+    def view(etag=None):
+        headers = dict(tokens['mpa'], **({'If-None-Match':etag} if etag else {}))
+        return requests.get(BASE+"/view_recipe/501", params={'likes':'True'}, headers=headers)
+
+    # Revalidations are answered from this worker's version cache
+    etag = view().headers['ETag']
+    if view(etag).status_code != 304: fail()
+
+    # Likes through the other worker reach this one's leaderboard and
+    # change the recipe's version
+    if requests.post(OTHER+"/like", data={'recipe_id':'501'}, headers=tokens['mpb']).json().get('status') != 1: fail()
+    r = view(etag)
+    if r.status_code != 200 or r.json()['data']['likes'] != '1' or r.headers['ETag'] == etag: fail()
+    if view(r.headers['ETag']).status_code != 304: fail()
+    if popular(BASE) != {'501', '503'}: fail()
+    res = requests.post(OTHER+"/like_batch", data={'recipe_ids':'[502]'}, headers=tokens['mpb']).json()
+    if res.get('status') != 1: fail()
+    if popular(BASE) != {'501', '502'}: fail()
+
+    # So do recipes created there
+    r = {'recipe_id':'504','name':'M504','description':'d','ingredients':'["rice"]'}
+    if requests.post(OTHER+"/create_recipe", data=r, headers=tokens['mpa']).json().get('status') != 1: fail()
+    r = {'recipe_id':'505','name':'M505','description':'d','ingredients':'["beans"]'}
+    if requests.post(OTHER+"/create_recipe", data=r, headers=tokens['mpb']).json().get('status') != 1: fail()
+    if pantry(BASE, ['rice', 'beans']) != {'501', '502', '503', '504', '505'}: fail()
+    if pantry(BASE, ['beans']) != {'505'}: fail()
+    for liker in ['mpa', 'mpb']:
+        if requests.post(OTHER+"/like", data={'recipe_id':'504'}, headers=tokens[liker]).json().get('status') != 1: fail()
+    if popular(BASE) != {'504', '502'}: fail()
+
+    # And deletions: mpb's likes go with the account
+    if requests.post(OTHER+"/delete", data={'username':'mpb'}, headers=tokens['mpb']).json().get('status') != 1: fail()
+    if popular(BASE) != {'504', '503'}: fail()
+    # mpb's recipe went with it
+    if pantry(BASE, ['beans']) != set(): fail()
+
+    check = requests.get(BASE+"/consistency").json()
+    if check.get('status') != 1 or not all(part['consistent'] for part in check['data'].values()): fail()
+
+    def user(base, name):
+        u = {'first_name':'Mu','last_name':'Lt','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+        if requests.post(base+"/create_user", data=u).json().get('status') != 1: fail()
+        return {'Authorization': requests.post(base+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+
+    def create(base, rid, headers):
+        r = {'recipe_id':rid,'name':'M'+rid,'description':'d','ingredients':'["corn"]'}
+        return requests.post(base+"/create_recipe", data=r, headers=headers).json().get('status')
+
+    def has_uid(headers):
+        payload = headers['Authorization'].split('.')[1]
+        return 'uid' in json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+
+    # Accounts: this worker cached mpb's id when it logged in here; the
+    # deletion through the other worker is noticed
+    if requests.get(BASE+"/search", params={'popular':'True'}, headers=tokens['mpb']).json().get('status') != 2: fail()
+    # The username taken again there: the old token names the new account
+    # (v1) or is rejected (v2, its uid is the deleted account's)
+    fresh = user(OTHER, 'mpb')
+    if create(BASE, '506', tokens['mpb']) != (2 if has_uid(tokens['mpb']) else 1): fail()
+    if create(BASE, '507', fresh) != 1: fail()
+
+    # A reset through the other worker starts ids over; mpa's cached id now
+    # belongs to whoever signs up first
+    requests.get(OTHER+"/clear")
+    user(OTHER, 'mpc')
+    tokens['mpa'] = user(OTHER, 'mpa')
+    if create(BASE, '601', tokens['mpa']) != 1: fail()
+    # The recipe is mpa's: it goes with mpa's account
+    if pantry(BASE, ['corn']) != {'601'}: fail()
+    if requests.post(OTHER+"/delete", data={'username':'mpa'}, headers=tokens['mpa']).json().get('status') != 1: fail()
+    # mpb went with the reset
+    if requests.get(BASE+"/search", params={'ingredients':'["corn"]'}, headers=fresh).json().get('status') != 2: fail()
+    mpc = {'Authorization': requests.post(BASE+"/login", data={'username':'mpc','password':'Qx7Yt9Lp'}).json()['jwt']}
+    if set(requests.get(BASE+"/search", params={'ingredients':'["corn"]'}, headers=mpc).json()['data']): fail()
+
+    print('Test Passed')
+except SystemExit:
+    raise
+except:
+    print('Test Failed')
+finally:
+    if worker is not None:
+        worker.terminate()
+        worker.wait()
@@ -0,0 +1,32 @@
+import requests
+import hashlib
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+try:
+    requests.get(BASE+"/clear")
+
+    kdf = requests.get(BASE+"/stats").json()['data']['password_hashing']['kdf']
+    u = {'first_name':'Kd','last_name':'Ff','username':'kdf','email_address':'kdf@x.com','password':'Qx7Yt9Lp','salt':'pepper'}
+    res = requests.post(BASE+"/create_user", data=u).json()
+    if res.get('status') != 1: fail()
+
+    # the hash names its KDF; the default stays plain salted SHA-256
+    pass_hash = res['pass_hash']
+    expected_prefix = {'sha256': '', 'pbkdf2': 'pbkdf2_sha256$', 'scrypt': 'scrypt$'}[kdf]
+    if not pass_hash.startswith(expected_prefix): fail()
+    if kdf == 'sha256' and pass_hash != hashlib.sha256(b'Qx7Yt9Lppepper').hexdigest(): fail()
+
+    if requests.post(BASE+"/login", data={'username':'kdf','password':'Qx7Yt9Lp'}).json().get('status') != 1: fail()
+    if requests.post(BASE+"/login", data={'username':'kdf','password':'Qx7Yt9Lq'}).json().get('status') != 2: fail()
+
+    stats = requests.get(BASE+"/stats").json()['data']['password_hashing']
+    if stats['hash_latency']['count'] < 3 or stats['pending'] != 0: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
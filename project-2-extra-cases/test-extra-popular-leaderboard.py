@@ -0,0 +1,56 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+try:
+    requests.get(BASE+"/clear")
+
+    users = {}
+    for name in ['pa', 'pb', 'pc', 'pd']:
+        u={'first_name':'Pop','last_name':'Board','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+        if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+        jwt=requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']
+        users[name]={'Authorization':jwt}
+
+    # pa and pb each author two recipes
+    for rid, author in [(3000,'pa'), (3001,'pa'), (3002,'pb'), (3003,'pb')]:
+        if not ok(requests.post(BASE+"/create_recipe", data={
+            'name':f'R{rid}','description':'d','recipe_id':rid,'ingredients':json.dumps(['x'])
+        }, headers=users[author])): fail()
+
+    # 3003: 3 likes, 3000: 2 likes, 3001: 1 like
+    for rid, liker in [(3003,'pa'), (3003,'pc'), (3003,'pd'), (3000,'pc'), (3000,'pd'), (3001,'pd')]:
+        if not ok(requests.post(BASE+"/like", data={'recipe_id':rid}, headers=users[liker])): fail()
+    # duplicate like must not move the ranking
+    if ok(requests.post(BASE+"/like", data={'recipe_id':3001}, headers=users['pd'])): fail()
+
+    res = requests.get(BASE+"/search", params={'popular':'True'}, headers=users['pc']).json()
+    if res.get('status') != 1 or set(res['data'].keys()) != {'3003', '3000'}: fail()
+    if res['data']['3003']['likes'] != '3': fail()
+
+    # deleting pd removes one like from each of 3003, 3000 and 3001
+    if not ok(requests.post(BASE+"/delete", data={'username':'pd'}, headers=users['pd'])): fail()
+    res = requests.get(BASE+"/search", params={'popular':'True'}, headers=users['pc']).json()
+    if set(res['data'].keys()) != {'3003', '3000'} or res['data']['3000']['likes'] != '1': fail()
+
+    # deleting pb removes its recipes (including the leader) from the ranking
+    if not ok(requests.post(BASE+"/delete", data={'username':'pb'}, headers=users['pb'])): fail()
+    res = requests.get(BASE+"/search", params={'popular':'True'}, headers=users['pc']).json()
+    if set(res['data'].keys()) != {'3000', '3001'}: fail()
+
+    check = requests.get(BASE+"/consistency").json()
+    if check.get('status') != 1: fail()
+    for result in check['data'].values():
+        if not result['consistent']: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
@@ -0,0 +1,40 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+try:
+    requests.get(BASE+"/clear")
+
+    user = {'first_name':'Par','last_name':'Ams','username':'pp','email_address':'pp@x.com','password':'Qx7Yt9Lp','salt':'s'}
+
+    # JSON body
+    res = requests.post(BASE+"/create_user", json=user).json()
+    if res.get('status') != 1: fail()
+
+    # raw query-string body without a form content type
+    res = requests.post(BASE+"/login", data="username=pp&password=Qx7Yt9Lp",
+                        headers={'Content-Type':'text/plain'}).json()
+    if res.get('status') != 1: fail()
+    jwt = res['jwt']
+
+    # an empty form field falls through to the other sources and stays missing
+    res = requests.post(BASE+"/create_recipe", data={'name':'', 'description':'d', 'recipe_id':5000},
+                        headers={'Authorization':jwt}).json()
+    if res.get('status') != 2: fail()
+
+    # oversized bodies are refused without being read, with the endpoint's own status
+    big = dict(user, username='pq', email_address='pq@x.com', first_name='x' * (2 * 1024 * 1024))
+    res = requests.post(BASE+"/create_user", data=big)
+    if res.json().get('status') != 4: fail()
+    res = requests.post(BASE+"/create_recipe", data=json.dumps({'name':'n'*(2*1024*1024), 'description':'d', 'recipe_id':5001}),
+                        headers={'Authorization':jwt, 'Content-Type':'application/json'})
+    if res.json().get('status') != 2: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
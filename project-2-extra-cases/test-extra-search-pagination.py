@@ -0,0 +1,85 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def pages(params, hdr):
+    """Every page of a paginated search, following next_cursor"""
+    result = []
+    params = dict(params)
+    while True:
+        res = requests.get(BASE+"/search", params=params, headers=hdr).json()
+        if res.get('status') != 1 or 'next_cursor' not in res: fail()
+        result.append([int(rid) for rid in res['data']])
+        if res['next_cursor'] is None:
+            return result
+        if len(result) > 20: fail()
+        params['cursor'] = res['next_cursor']
+
+try:
+    requests.get(BASE+"/clear")
+    tokens = {}
+    for name in ['pa', 'pb', 'pc']:
+        u = {'first_name':'Pa','last_name':'Ge','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+        if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+        tokens[name] = {'Authorization': requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+    for name in ['pb', 'pc']:
+        if requests.post(BASE+"/follow", data={'username':name}, headers=tokens['pa']).json().get('status') != 1: fail()
+
+    # 7 recipes alternating between pb and pc, oldest first
+    ids = [301, 302, 303, 304, 305, 306, 307]
+    for i, rid in enumerate(ids):
+        author = tokens['pb'] if i % 2 == 0 else tokens['pc']
+        ings = ['flour', 'water'] if i % 3 else ['flour']
+        r = {'recipe_id':str(rid),'name':'P%d' % rid,'description':'d','ingredients':json.dumps(ings)}
+        if requests.post(BASE+"/create_recipe", data=r, headers=author).json().get('status') != 1: fail()
+    # likes: 303 and 305 twice, 306 once
+    for rid, likers in [(303, ['pa', 'pb']), (305, ['pa', 'pc']), (306, ['pb'])]:
+        for liker in likers:
+            if requests.post(BASE+"/like", data={'recipe_id':str(rid)}, headers=tokens[liker]).json().get('status') != 1: fail()
+
+    h = tokens['pa']
+
+    # Without pagination parameters nothing changes
+    res = requests.get(BASE+"/search", params={'feed':'True'}, headers=h).json()
+    if 'next_cursor' in res or set(res['data']) != {'306', '307'}: fail()
+    res = requests.get(BASE+"/search", params={'popular':'True'}, headers=h).json()
+    if 'next_cursor' in res or set(res['data']) != {'303', '305'}: fail()
+
+    # Feed: newest first, 3 per page
+    feed = pages({'feed':'True', 'limit':'3'}, h)
+    if [set(p) for p in feed] != [{305, 306, 307}, {302, 303, 304}, {301}]: fail()
+
+    # Popular: likes, then newest; page 1 of 2 matches the default answer
+    popular = pages({'popular':'True', 'limit':'2'}, h)
+    if [set(p) for p in popular] != [{303, 305}, {306, 307}, {302, 304}, {301}]: fail()
+
+    # Ingredients: recipe_id order, every match exactly once
+    everything = requests.get(BASE+"/search", params={'ingredients':json.dumps(['flour', 'water'])}, headers=h).json()
+    if 'next_cursor' in everything or sorted(int(r) for r in everything['data']) != ids: fail()
+    only_flour = requests.get(BASE+"/search", params={'ingredients':json.dumps(['flour'])}, headers=h).json()
+    ing = pages({'ingredients':json.dumps(['flour', 'water']), 'limit':'3'}, h)
+    if [sorted(p) for p in ing] != [[301, 302, 303], [304, 305, 306], [307]]: fail()
+    flour = pages({'ingredients':json.dumps(['flour']), 'limit':'1'}, h)
+    if sum(flour, []) != sorted(int(r) for r in only_flour['data']): fail()
+
+    # A limit larger than the result set gives one page and no cursor
+    single = pages({'feed':'True', 'limit':'50'}, h)
+    if len(single) != 1 or set(single[0]) != set(ids): fail()
+
+    # Bad limits and cursors are rejected
+    first = requests.get(BASE+"/search", params={'feed':'True', 'limit':'2'}, headers=h).json()
+    for bad in [{'feed':'True', 'limit':'0'}, {'feed':'True', 'limit':'x'},
+                {'feed':'True', 'cursor':'not-a-cursor'},
+                {'popular':'True', 'cursor':first['next_cursor']}]:
+        if requests.get(BASE+"/search", params=bad, headers=h).json().get('status') != 2: fail()
+
+    print('Test Passed')
+except SystemExit:
+    raise
+except:
+    print('Test Failed')
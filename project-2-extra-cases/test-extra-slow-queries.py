@@ -0,0 +1,59 @@
+import requests
+import json
+import time
+import os
+
+BASE = "http://127.0.0.1:5000"
+# The server is expected to run from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def entries(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+try:
+    info = requests.get(BASE+"/stats").json()['data']['slow_queries']
+    if info is None:
+        # SLOW_QUERY_LOG is not set
+        print('Test Passed')
+        raise SystemExit
+    path = os.path.join(ROOT, info['path'])
+
+    requests.get(BASE+"/clear")
+    u = {'first_name':'Sl','last_name':'Ow','username':'slowq','email_address':'slowq@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+    token = requests.post(BASE+"/login", data={'username':'slowq','password':'Qx7Yt9Lp'}).json()['jwt']
+    r = {'recipe_id':'901','name':'Slow Stew','description':'d','ingredients':'["salt","water"]'}
+    if requests.post(BASE+"/create_recipe", data=r, headers={'Authorization':token}).json().get('status') != 1: fail()
+    res = requests.get(BASE+"/search", params={'ingredients':'["salt","water"]'}, headers={'Authorization':token})
+    if res.json().get('status') != 1: fail()
+
+    if info['threshold_ms'] == 0:
+        # every statement is slow enough; wait for the background writer
+        deadline = time.time() + 10
+        while True:
+            logged = [e for e in entries(path) if e['endpoint'] == '/search']
+            if logged or time.time() > deadline: break
+            time.sleep(0.1)
+        if not logged: fail()
+        for e in logged:
+            if e['method'] != 'GET' or e['ms'] < 0: fail()
+            if not isinstance(e['params'], list): fail()
+            # values are never written, only their shape
+            if 'salt' in json.dumps(e['params']) or 'slowq' in json.dumps(e['params']): fail()
+        selects = [e for e in logged if e['sql'].startswith(('SELECT', 'WITH'))]
+        if not selects: fail()
+        if not all(e.get('plan') for e in selects): fail()
+        if requests.get(BASE+"/stats").json()['data']['slow_queries']['logged'] < len(logged): fail()
+
+    print('Test Passed')
+except SystemExit:
+    raise
+except:
+    print('Test Failed')
@@ -0,0 +1,28 @@
+import requests
+import subprocess
+import sys
+import os
+
+BASE = "http://127.0.0.1:5000"
+# The server is expected to run from the repository root, next to project2.db
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+try:
+    requests.get(BASE+"/clear")
+
+    u = {'first_name':'St','last_name':'Ar','username':'sta','email_address':'sta@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if requests.post(BASE+"/create_user", data=u).json().get('status') != 1: fail()
+
+    # another worker process starting up finds the schema current and keeps the data
+    for _ in range(2):
+        started = subprocess.run([sys.executable, '-c', 'import app; app.get_db().close()'], cwd=ROOT, capture_output=True, timeout=60)
+        if started.returncode != 0: fail()
+        if requests.post(BASE+"/login", data={'username':'sta','password':'Qx7Yt9Lp'}).json().get('status') != 1: fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
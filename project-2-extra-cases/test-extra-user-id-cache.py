@@ -0,0 +1,83 @@
+import requests
+import json
+import base64
+import hashlib
+import hmac
+import os
+
+BASE = "http://127.0.0.1:5000"
+# The server is expected to run from the repository root, next to key.txt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+def make_user(name):
+    u={'first_name':'Id','last_name':'Cache','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+    return {'Authorization':requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+
+def claims(headers):
+    payload = headers['Authorization'].split('.')[1]
+    return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+
+def signed(payload):
+    """A token for payload signed with the server's key, in the /login format"""
+    with open(os.path.join(ROOT, 'key.txt')) as f:
+        key = f.read().strip()
+    header = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode()).decode()
+    body = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    signature = hmac.new(key.encode(), f"{header}.{body}".encode(), hashlib.sha256).hexdigest()
+    return {'Authorization': f"{header}.{body}.{signature}"}
+
+try:
+    requests.get(BASE+"/clear")
+
+    ua = make_user('ida')
+    ub = make_user('idb')
+    if not ok(requests.post(BASE+"/create_recipe", data={
+        'name':'R','description':'d','recipe_id':4000,'ingredients':json.dumps(['x'])
+    }, headers=ub)): fail()
+
+    # repeated writes resolve the caller's id from the cache
+    before = requests.get(BASE+"/stats").json()['data']['user_id_cache']['hits']
+    if not ok(requests.post(BASE+"/like", data={'recipe_id':4000}, headers=ua)): fail()
+    if not ok(requests.post(BASE+"/follow", data={'username':'idb'}, headers=ua)): fail()
+    if requests.get(BASE+"/stats").json()['data']['user_id_cache']['hits'] < before + 2: fail()
+
+    # a deleted account's token is rejected everywhere
+    if not ok(requests.post(BASE+"/delete", data={'username':'ida'}, headers=ua)): fail()
+    if ok(requests.post(BASE+"/like", data={'recipe_id':4000}, headers=ua)): fail()
+    if ok(requests.post(BASE+"/create_recipe", data={
+        'name':'R','description':'d','recipe_id':4001
+    }, headers=ua)): fail()
+    if requests.get(BASE+"/search", params={'feed':'True'}, headers=ua).json().get('status') != 2: fail()
+    if ok(requests.post(BASE+"/delete", data={'username':'ida'}, headers=ua)): fail()
+
+    # re-creating the username gives a new account the old token names;
+    # a v2 token also names the old account's id and stays rejected
+    make_user('ida')
+    v2 = 'uid' in claims(ua)
+    if ok(requests.post(BASE+"/like", data={'recipe_id':4000}, headers=ua)) == v2: fail()
+    if (requests.get(BASE+"/search", params={'feed':'True'}, headers=ua).json().get('status') == 1) == v2: fail()
+    res = requests.get(BASE+"/view_recipe/4000", params={'likes':'True'}, headers=ub).json()
+    if res['data']['likes'] != ('0' if v2 else '1'): fail()
+
+    # a uid that is not the username's is rejected on writes and reads alike,
+    # whether or not the username's id is cached
+    forged = signed({'username':'idb', 'uid':10**9})
+    for _ in range(2):
+        if ok(requests.post(BASE+"/like", data={'recipe_id':4000}, headers=forged)): fail()
+        if ok(requests.post(BASE+"/follow", data={'username':'ida'}, headers=forged)): fail()
+        if requests.get(BASE+"/search", params={'feed':'True'}, headers=forged).json().get('status') != 2: fail()
+        if ok(requests.post(BASE+"/delete", data={'username':'idb'}, headers=forged)): fail()
+    # while idb's own token still works
+    if not ok(requests.post(BASE+"/like", data={'recipe_id':4000}, headers=ub)): fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
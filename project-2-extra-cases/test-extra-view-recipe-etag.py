@@ -0,0 +1,66 @@
+import requests
+import json
+
+BASE = "http://127.0.0.1:5000"
+
+def fail():
+    print('Test Failed')
+    raise SystemExit
+
+def ok(r):
+    return r.json().get('status') == 1
+
+def make_user(name):
+    u={'first_name':'Et','last_name':'Ag','username':name,'email_address':name+'@x.com','password':'Qx7Yt9Lp','salt':'s'}
+    if not ok(requests.post(BASE+"/create_user", data=u)): fail()
+    return {'Authorization':requests.post(BASE+"/login", data={'username':name,'password':'Qx7Yt9Lp'}).json()['jwt']}
+
+def view(headers, **flags):
+    return requests.get(BASE+"/view_recipe/8000", params={k:'True' for k in flags}, headers=headers)
+
+try:
+    requests.get(BASE+"/clear")
+
+    ea = make_user('ea')
+    eb = make_user('eb')
+    if not ok(requests.post(BASE+"/create_recipe", data={
+        'name':'Soup','description':'d','recipe_id':8000,'ingredients':json.dumps(['leek'])
+    }, headers=ea)): fail()
+
+    r = view(eb, name=1, likes=1)
+    etag = r.headers.get('ETag')
+    if r.json()['data'] != {'name':'Soup', 'likes':'0'} or not etag: fail()
+    if r.headers.get('Cache-Control') != 'public, no-cache': fail()
+
+    # unchanged: 304, from the version cache when it is enabled (the only
+    # statement checks the shared change counters)
+    cached = requests.get(BASE+"/stats").json()['data']['recipe_versions']['max_size'] > 0
+    r = view(dict(eb, **{'If-None-Match':etag}), name=1, likes=1)
+    if r.status_code != 304 or r.headers.get('ETag') != etag: fail()
+    if cached and r.headers.get('X-SQL-Statements') != '1': fail()
+
+    # a different field selection is a different representation
+    r = view(dict(eb, **{'If-None-Match':etag}), name=1)
+    if r.status_code != 200 or r.headers.get('ETag') == etag: fail()
+    name_etag = r.headers['ETag']
+
+    # a like changes the likes representation but not the name-only one
+    if not ok(requests.post(BASE+"/like", data={'recipe_id':8000}, headers=eb)): fail()
+    r = view(dict(eb, **{'If-None-Match':etag}), name=1, likes=1)
+    if r.status_code != 200 or r.json()['data']['likes'] != '1': fail()
+    r = view(dict(eb, **{'If-None-Match':name_etag}), name=1)
+    if r.status_code != 304: fail()
+
+    # invalid tokens never get a 304
+    r = view({'Authorization':'bad', 'If-None-Match':name_etag}, name=1)
+    if r.status_code != 200 or r.json()['status'] != 2: fail()
+
+    # re-creating the recipe id under another author invalidates old tags
+    if not ok(requests.post(BASE+"/delete", data={'username':'ea'}, headers=ea)): fail()
+    if not ok(requests.post(BASE+"/create_recipe", data={'name':'Stew','description':'d','recipe_id':8000}, headers=eb)): fail()
+    r = view(dict(eb, **{'If-None-Match':name_etag}), name=1)
+    if r.status_code != 200 or r.json()['data']['name'] != 'Stew': fail()
+
+    print('Test Passed')
+except:
+    print('Test Failed')
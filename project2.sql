@@ -1,3 +1,6 @@
+-- Version 0 schema; migrations.py upgrades it to the latest version
+PRAGMA user_version = 0;
+
 DROP TABLE IF EXISTS password_history;
 DROP TABLE IF EXISTS follows;
 DROP TABLE IF EXISTS likes;
@@ -0,0 +1,78 @@
+"""
+Per-recipe version cache for Project 2 - The Meals LAN
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class RecipeVersions:
+    """Bounded LRU mapping recipe_id -> (seq, like_count).
+
+    A recipe's name, description and ingredients never change after it is
+    created, so (recipe_inserts.seq, like_count) identifies everything
+    /view_recipe can return; seq is never reused, even for a re-created
+    recipe_id.  Writers call invalidate() after committing.  Readers take
+    a stamp() before reading the database and fill() with it afterwards;
+    the fill is dropped if a writer touched the recipe in between, so a
+    read that raced a commit never caches a stale version.
+    """
+
+    def __init__(self, max_size=100000, stripes=1024):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stripes = [0] * stripes
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, recipe_id):
+        """Return the cached (seq, like_count) or None"""
+        with self._lock:
+            version = self._entries.get(recipe_id)
+            if version is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(recipe_id)
+            self.hits += 1
+            return version
+
+    def stamp(self, recipe_id):
+        with self._lock:
+            return self._generation, self._stripes[recipe_id % len(self._stripes)]
+
+    def fill(self, recipe_id, version, stamp):
+        """Cache a version read from the database after stamp() was taken"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if stamp != (self._generation, self._stripes[recipe_id % len(self._stripes)]):
+                return
+            self._entries[recipe_id] = version
+            self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, recipe_ids):
+        """Forget recipes whose likes changed or that were created or deleted"""
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._stripes[recipe_id % len(self._stripes)] += 1
+                self._entries.pop(recipe_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "max_size": self.max_size,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
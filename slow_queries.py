@@ -0,0 +1,194 @@
+"""
+Slow-query log for Project 2 - The Meals LAN
+
+Statements that take at least a threshold (executing plus fetching their
+rows) are handed to a logging QueueHandler, which only appends to a queue,
+so the request thread never waits on disk.  A QueueListener thread runs
+EXPLAIN QUERY PLAN for each one on its own connection and writes a JSON
+line to a RotatingFileHandler:
+
+    {"at": ..., "endpoint": "/search", "method": "POST", "ms": 123.4,
+     "sql": "SELECT ... WHERE r.id = ?", "params": ["int", "str(40)"],
+     "plan": ["SEARCH r USING INTEGER PRIMARY KEY (rowid=?)"]}
+
+Parameter values are never written, only their types (and lengths for
+strings and blobs).
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+
+# Statements EXPLAIN QUERY PLAN is worth running for
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and replace literals with ?, so equal queries log equal text"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?, ...", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def param_shape(params):
+    """Types (and lengths) of the bound parameters, without their values"""
+    if params is None:
+        return "executemany"
+    if isinstance(params, dict):
+        return {name: _shape(value) for name, value in params.items()}
+    return [_shape(value) for value in params]
+
+
+def _shape(value):
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def _placeholder_count(sql):
+    return _STRING.sub("", sql).count("?")
+
+
+class PlanHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that adds the statement's query plan to each entry.
+
+    Runs on the listener thread, which owns the connection used for EXPLAIN.
+    """
+
+    def __init__(self, path, connect, max_bytes, backups):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, delay=True)
+        self._connect = connect
+        self._conn = None
+        self._plans = {}
+
+    def explain(self, sql, params):
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        plan = self._plans.get(sql)
+        if plan is not None:
+            return plan
+        if params is None:
+            params = (None,) * _placeholder_count(sql)
+        if self._conn is None:
+            self._conn = self._connect()
+            self._conn.execute("PRAGMA query_only = ON")
+        rows = self._conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        # Indent each step under its parent, like the sqlite3 shell
+        depth = {0: -1}
+        plan = []
+        for node, parent, _unused, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            plan.append("  " * depth[node] + detail)
+        if len(self._plans) >= 1000:
+            self._plans.clear()
+        self._plans[sql] = plan
+        return plan
+
+    def emit(self, record):
+        entry = {
+            "at": record.created,
+            "endpoint": record.endpoint,
+            "method": record.method,
+            "ms": round(record.seconds * 1000, 3),
+            "sql": normalize_sql(record.sql),
+            "params": param_shape(record.params),
+        }
+        try:
+            entry["plan"] = self.explain(record.sql, record.params)
+        except Exception as e:
+            entry["plan_error"] = str(e)
+            # The database may have been replaced underneath the connection
+            self.close_connection()
+        record.msg = json.dumps(entry)
+        record.args = None
+        super().emit(record)
+
+    def close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except:
+                pass
+            self._conn = None
+
+    def close(self):
+        self.close_connection()
+        super().close()
+
+
+class CountingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops (and counts) entries when the queue is full"""
+
+    def __init__(self, log_queue, log):
+        super().__init__(log_queue)
+        self._log = log
+
+    def prepare(self, record):
+        # The listener formats the entry itself; keep the parameters it needs
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self._log.logged += 1
+        except queue.Full:
+            self._log.dropped += 1
+
+
+class SlowQueryLog:
+    """Statements slower than ``threshold`` seconds, written asynchronously to ``path``"""
+
+    def __init__(self, path, threshold, connect, max_bytes=10 * 1024 * 1024, backups=5, max_pending=10000):
+        self.path = path
+        self.threshold = threshold
+        self.logged = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._handler = PlanHandler(path, connect, max_bytes, backups)
+        self._listener = logging.handlers.QueueListener(self._queue, self._handler)
+        self._logger = logging.getLogger(f"meals.slow_queries.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(CountingQueueHandler(self._queue, self))
+        self._lock = threading.Lock()
+        self._started = False
+
+    def record(self, sql, params, seconds, endpoint=None, method=None):
+        """Queue a statement for the log; never blocks"""
+        self._logger.info("slow query", extra={
+            "sql": sql, "params": params, "seconds": seconds, "endpoint": endpoint, "method": method,
+        })
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._listener.start()
+                self._started = True
+
+    def stop(self):
+        """Write out everything queued so far and stop the listener thread"""
+        with self._lock:
+            if self._started:
+                self._listener.stop()
+                self._started = False
+        self._handler.close()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "logged": self.logged,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize(),
+        }
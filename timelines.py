@@ -0,0 +1,240 @@
+"""
+Fan-out-on-write feed timelines for Project 2 - The Meals LAN
+
+Each user has a bounded timeline in feed_entries holding the newest
+recipes of the authors they follow, written when a recipe is created
+(fan-out) and when a follow is made (backfill).  Authors whose follower
+count passes the pull threshold are flagged with users.pull_feed; their
+recipes are not fanned out but pulled at read time and merged in.  The
+flag is sticky, so nothing an author posts after crossing the threshold
+can be missing from both paths.
+"""
+
+import json
+
+
+def _order_key(row):
+    # rows are (recipe_id, created_at, seq); NULL seq sorts last like SQLite DESC
+    return (row[1] or "", -1 if row[2] is None else row[2])
+
+
+def fan_out(cursor, author_id, recipe_id, created_at, seq, limit, pull_threshold):
+    """Push a new recipe to its author's followers; returns False for pull authors"""
+    return fan_out_many(cursor, author_id, [(recipe_id, created_at, seq)], limit, pull_threshold)
+
+
+def fan_out_many(cursor, author_id, entries, limit, pull_threshold):
+    """Push (recipe_id, created_at, seq) entries of one author in a fixed number of statements"""
+    if not entries:
+        return True
+    cursor.execute("SELECT pull_feed FROM users WHERE id = ?", (author_id,))
+    row = cursor.fetchone()
+    if row is None or row[0]:
+        return False
+    cursor.execute("""
+        SELECT COUNT(*) FROM (SELECT 1 FROM follows WHERE following_id = ? LIMIT ?)
+    """, (author_id, pull_threshold + 1))
+    if cursor.fetchone()[0] > pull_threshold:
+        cursor.execute("UPDATE users SET pull_feed = 1 WHERE id = ?", (author_id,))
+        return False
+    cursor.execute("""
+        INSERT OR IGNORE INTO feed_entries (user_id, recipe_id, created_at, seq)
+        SELECT f.follower_id, json_extract(e.value, '$[0]'), json_extract(e.value, '$[1]'),
+               json_extract(e.value, '$[2]')
+        FROM follows f, json_each(?) e
+        WHERE f.following_id = ?
+    """, (json.dumps(entries), author_id))
+    cursor.execute("""
+        UPDATE users SET feed_len = feed_len + ?
+        WHERE id IN (SELECT follower_id FROM follows WHERE following_id = ?)
+    """, (len(entries), author_id))
+    # Timelines may grow to twice the limit before being cut back,
+    # which keeps trimming amortised O(1) per entry
+    cursor.execute("""
+        SELECT id FROM users
+        WHERE id IN (SELECT follower_id FROM follows WHERE following_id = ?)
+        AND feed_len > ?
+    """, (author_id, 2 * limit))
+    for (user_id,) in cursor.fetchall():
+        trim(cursor, user_id, limit)
+    return True
+
+
+def backfill(cursor, follower_id, following_id, limit):
+    """Copy the followed author's newest recipes into the follower's timeline"""
+    cursor.execute("SELECT pull_feed FROM users WHERE id = ?", (following_id,))
+    row = cursor.fetchone()
+    if row is None or row[0]:
+        return
+    cursor.execute("""
+        INSERT OR IGNORE INTO feed_entries (user_id, recipe_id, created_at, seq)
+        SELECT ?, r.recipe_id, r.created_at, ri.seq
+        FROM recipes r
+        LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+        WHERE r.user_id = ?
+        ORDER BY r.created_at DESC, ri.seq DESC
+        LIMIT ?
+    """, (follower_id, following_id, limit))
+    trim(cursor, follower_id, limit)
+
+
+def readers_of_author(cursor, author_id):
+    """Users whose timelines currently hold recipes by this author"""
+    cursor.execute("""
+        SELECT DISTINCT e.user_id
+        FROM recipes r
+        JOIN feed_entries e ON e.recipe_id = r.recipe_id
+        WHERE r.user_id = ?
+    """, (author_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def refill(cursor, user_ids, limit):
+    """Rebuild the given timelines from follows and recipes, in three statements.
+
+    Needed after an author is deleted: their entries cascade away, and the
+    older entries that trimming dropped to make room for them must return.
+    """
+    if not user_ids:
+        return
+    readers = json.dumps(user_ids)
+    cursor.execute("""
+        DELETE FROM feed_entries WHERE user_id IN (SELECT value FROM json_each(?))
+    """, (readers,))
+    cursor.execute("""
+        INSERT INTO feed_entries (user_id, recipe_id, created_at, seq)
+        SELECT follower_id, recipe_id, created_at, seq FROM (
+            SELECT f.follower_id, r.recipe_id, r.created_at, ri.seq,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY f.follower_id
+                       ORDER BY r.created_at DESC, ri.seq DESC
+                   ) AS position
+            FROM follows f
+            JOIN users u ON u.id = f.following_id AND u.pull_feed = 0
+            JOIN recipes r ON r.user_id = f.following_id
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+            WHERE f.follower_id IN (SELECT value FROM json_each(?))
+        )
+        WHERE position <= ?
+    """, (readers, limit))
+    cursor.execute("""
+        UPDATE users SET feed_len = (SELECT COUNT(*) FROM feed_entries WHERE user_id = users.id)
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (readers,))
+
+
+def trim(cursor, user_id, limit):
+    """Cut a timeline back to its newest `limit` entries"""
+    cursor.execute("""
+        DELETE FROM feed_entries
+        WHERE user_id = ? AND rowid NOT IN (
+            SELECT rowid FROM feed_entries
+            WHERE user_id = ?
+            ORDER BY created_at DESC, seq DESC
+            LIMIT ?
+        )
+    """, (user_id, user_id, limit))
+    cursor.execute("""
+        UPDATE users SET feed_len = (SELECT COUNT(*) FROM feed_entries WHERE user_id = ?)
+        WHERE id = ?
+    """, (user_id, user_id))
+
+
+def read(cursor, user_id, k):
+    """Recipe ids of the k newest recipes by authors the user follows"""
+    return [row[0] for row in page(cursor, user_id, k)]
+
+
+def page(cursor, user_id, k, before=None, length=None):
+    """(recipe_id, created_at, seq) of the k newest feed recipes older than ``before``.
+
+    ``before`` is the (created_at, seq) of the last recipe already shown.
+    A timeline holds only the newest ``length`` pushed recipes, so once it
+    runs out (on a later page, or a page longer than the timeline) the
+    followed push authors' older recipes are read from recipes directly.
+    """
+    if before is None:
+        cursor.execute("""
+            SELECT recipe_id, created_at, seq
+            FROM feed_entries
+            WHERE user_id = ?
+            ORDER BY created_at DESC, seq DESC
+            LIMIT ?
+        """, (user_id, k))
+        rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT r.recipe_id, r.created_at, ri.seq
+            FROM users u
+            JOIN follows f ON f.follower_id = ? AND f.following_id = u.id
+            JOIN recipes r ON r.user_id = u.id
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+            WHERE u.pull_feed = 1
+            ORDER BY r.created_at DESC, ri.seq DESC
+            LIMIT ?
+        """, (user_id, k))
+        pulled = cursor.fetchall()
+    else:
+        cursor.execute("""
+            SELECT recipe_id, created_at, seq
+            FROM feed_entries
+            WHERE user_id = ? AND (created_at, seq) < (?, ?)
+            ORDER BY created_at DESC, seq DESC
+            LIMIT ?
+        """, (user_id, before[0], before[1], k))
+        rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT r.recipe_id, r.created_at, ri.seq
+            FROM users u
+            JOIN follows f ON f.follower_id = ? AND f.following_id = u.id
+            JOIN recipes r ON r.user_id = u.id
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+            WHERE u.pull_feed = 1 AND (r.created_at, ri.seq) < (?, ?)
+            ORDER BY r.created_at DESC, ri.seq DESC
+            LIMIT ?
+        """, (user_id, before[0], before[1], k))
+        pulled = cursor.fetchall()
+    # A timeline that returned fewer than k rows is exhausted; it is also
+    # complete unless it was cut back to `length` entries at some point
+    if len(rows) < k and length is not None and (before is not None or k > length):
+        oldest = rows[-1][1:] if rows else before
+        if oldest is not None:
+            cursor.execute("""
+                SELECT r.recipe_id, r.created_at, ri.seq
+                FROM follows f
+                JOIN users u ON u.id = f.following_id AND u.pull_feed = 0
+                JOIN recipes r ON r.user_id = f.following_id
+                LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+                WHERE f.follower_id = ? AND (r.created_at, ri.seq) < (?, ?)
+                ORDER BY r.created_at DESC, ri.seq DESC
+                LIMIT ?
+            """, (user_id, oldest[0], oldest[1], k - len(rows)))
+            rows = rows + cursor.fetchall()
+    if pulled:
+        # A pull author may have been fanned out before crossing the threshold
+        seen = {row[0] for row in rows}
+        rows = rows + [row for row in pulled if row[0] not in seen]
+        rows.sort(key=_order_key, reverse=True)
+    return rows[:k]
+
+
+def rebuild(cursor, limit):
+    """Recreate every timeline from follows and recipes"""
+    cursor.execute("DELETE FROM feed_entries")
+    cursor.execute("""
+        INSERT INTO feed_entries (user_id, recipe_id, created_at, seq)
+        SELECT follower_id, recipe_id, created_at, seq FROM (
+            SELECT f.follower_id, r.recipe_id, r.created_at, ri.seq,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY f.follower_id
+                       ORDER BY r.created_at DESC, ri.seq DESC
+                   ) AS position
+            FROM follows f
+            JOIN users u ON u.id = f.following_id AND u.pull_feed = 0
+            JOIN recipes r ON r.user_id = f.following_id
+            LEFT JOIN recipe_inserts ri ON ri.recipe_id = r.recipe_id
+        )
+        WHERE position <= ?
+    """, (limit,))
+    cursor.execute("""
+        UPDATE users SET feed_len = (SELECT COUNT(*) FROM feed_entries WHERE user_id = users.id)
+    """)